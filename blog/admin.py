@@ -1,7 +1,7 @@
 # Импорт модуля администратора Django
 from django.contrib import admin
 # Импорт модели Post из текущего приложения
-from .models import Comment, Post
+from .models import Comment, OutgoingEmail, Post
 
 # Регистрация модели Post с кастомной админ-конфигурацией
 # Декоратор @admin.register заменяет admin.site.register(Post, PostAdmin)
@@ -86,6 +86,26 @@ class CommentForm(admin.ModelAdmin):
         'email',    # Поиск по email
         'body'      # Поиск по тексту комментария
     ]
+
+@admin.register(OutgoingEmail)
+class OutgoingEmailAdmin(admin.ModelAdmin):
+    # Очередь исходящих писем: статус, попытки и последняя ошибка
+    list_display = [
+        'subject',       # Тема письма
+        'recipient',     # Получатель
+        'status',        # Статус отправки
+        'attempts',      # Число попыток
+        'next_attempt',  # Время следующей попытки
+        'sent'           # Время отправки
+    ]
+    list_filter = [
+        'status',   # Фильтр по статусу
+        'created'   # Фильтр по дате постановки в очередь
+    ]
+    search_fields = [
+        'recipient',  # Поиск по получателю
+        'subject'     # Поиск по теме
+    ]
 # Ключевые особенности:
 # Оптимизация интерфейса:
 # raw_id_fields ускоряет загрузку при многих пользователях
@@ -17,13 +17,21 @@ class BlogConfig(AppConfig):
     # Имя приложения (должно соответствовать имени пакета)
     # Используется Django для идентификации приложения в системе
     name = 'blog'
-    
+
     # Дополнительные часто используемые атрибуты (не показаны в этом коде):
     # verbose_name = 'Блог'  # Человекочитаемое имя приложения
-    # 
-    # def ready(self):
-    #     # Импорт сигналов или выполнение инициализации
-    #     import blog.signals
+
+    def ready(self):
+        """Инициализация приложения после загрузки реестра моделей"""
+        # Регистрация обработчиков сигналов (инвалидация кеша и т.д.)
+        from . import signals  # noqa: F401
+        # Обёртка SQL-замеров ставится на соединения при их открытии (connection_created)
+        from . import instrumentation  # noqa: F401
+        # Шаблоны, URL-резолвер и Markdown готовятся до первого запроса (профиль production)
+        from django.conf import settings
+        if settings.BLOG_WARMUP:
+            from .warmup import warm_up
+            warm_up()
 # Ключевые особенности:
 # Назначение файла apps.py:
 # Содержит конфигурацию конкретного приложения
@@ -0,0 +1,138 @@
+# Асинхронные версии публичных представлений блога (для ASGI, BLOG_ASYNC_VIEWS=True)
+#
+# Запросы к БД идут через async-ORM Django, кеш - через aget/aset. Отрисовка
+# шаблонов выполняется в потоке sync_to_async: теги боковой панели и пагинатор
+# по номерам страниц обращаются к БД синхронно.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.shortcuts import aget_object_or_404, render
+from django.views.decorators.http import require_POST
+from taggit.models import Tag
+
+from .forms import CommentForm, EmailPostForm, SearchForm
+from .ingest import buffer_comment, buffering_enabled
+from .lookup import aget_published_post
+from .models import Post
+from .outbox import aenqueue_mail
+from .page_cache import cache_page_for_anonymous
+from .pagination import CursorPaginator
+from .related import RELATED_POSTS_LIMIT
+from .routers import apin_to_primary
+from .search import asearch_post_ids
+from .views import comments_paginator, numbered_page, share_mail
+
+arender = sync_to_async(render)
+
+
+@cache_page_for_anonymous
+async def post_list(request, tag_slug=None):
+    """Список опубликованных постов (см. views.post_list)"""
+    post_list = Post.published.select_related('author').prefetch_related('tags')
+    tag = None
+    if tag_slug:
+        tag = await aget_object_or_404(Tag, slug=tag_slug)
+        post_list = post_list.filter(tags__in=[tag])
+
+    if settings.BLOG_PAGINATION_MODE == 'cursor':
+        posts = await CursorPaginator(post_list, 3).aget_page(request.GET.get('cursor'))
+    else:
+        posts = await sync_to_async(numbered_page)(request, post_list)
+    return await arender(request, 'blog/post/list.html', {'posts': posts, 'tag': tag})
+
+
+@cache_page_for_anonymous
+async def post_detail(request, year, month, day, post):
+    """Страница поста (см. views.post_detail)"""
+    post = await aget_published_post(year, month, day, post)
+    comments = await comments_paginator(post).aget_page()
+    similar_posts = [
+        link.related
+        async for link in post.related_links.select_related('related')[:RELATED_POSTS_LIMIT]
+    ]
+    return await arender(
+        request,
+        'blog/post/detail.html',
+        {
+            'post': post,
+            'comments': comments,
+            'form': CommentForm(),
+            'similar_posts': similar_posts,
+        }
+    )
+
+
+async def post_share(request, post_id):
+    """Форма "поделиться постом": письмо ставится в очередь без ожидания SMTP"""
+    post = await aget_object_or_404(Post, id=post_id, status=Post.Status.PUBLISHED)
+    sent = False
+    if request.method == 'POST':
+        form = EmailPostForm(request.POST)
+        if form.is_valid():
+            await aenqueue_mail(**share_mail(request, post, form.cleaned_data))
+            sent = True
+    else:
+        form = EmailPostForm()
+    return await arender(
+        request, 'blog/post/share.html', {'post': post, 'form': form, 'sent': sent}
+    )
+
+
+@require_POST
+async def post_comment(request, post_id):
+    """Приём комментария (см. views.post_comment)"""
+    post = await aget_object_or_404(
+        Post.published.only('id', 'publish', 'slug'),
+        id=post_id,
+    )
+    form = CommentForm(request.POST)
+    if form.is_valid():
+        await apin_to_primary(request)
+        if buffering_enabled() and await sync_to_async(buffer_comment)(post, form.cleaned_data):
+            return await arender(
+                request,
+                'blog/post/comment.html',
+                {'post': post, 'form': form, 'comment': form.instance, 'pending': True}
+            )
+        comment = form.save(commit=False)
+        comment.post = post
+        await comment.asave()  # Сигналы (счётчики, сброс кеша) выполняются в потоке asave
+        return await arender(
+            request,
+            'blog/post/comment.html',
+            {'post': post, 'form': form, 'comment': comment}
+        )
+    return await arender(request, 'blog/post/comment.html', {'post': post, 'form': form})
+
+
+async def post_search(request):
+    """Поиск постов (см. views.post_search)"""
+    form = SearchForm()
+    query = None
+    results = []
+    page = None
+    timed_out = False
+    capped = False
+
+    if 'query' in request.GET:
+        form = SearchForm(request.GET)
+        if form.is_valid():
+            query = form.cleaned_data['query']
+            ids, timed_out = await asearch_post_ids(query)
+            capped = len(ids) >= settings.BLOG_SEARCH_MAX_RESULTS
+            page = Paginator(ids, settings.BLOG_SEARCH_PER_PAGE).get_page(request.GET.get('page'))
+            posts = await Post.published.ain_bulk(page.object_list)
+            results = [posts[pk] for pk in page.object_list if pk in posts]
+
+    return await arender(
+        request,
+        'blog/post/search.html',
+        {
+            'form': form,
+            'query': query,
+            'results': results,
+            'page': page,
+            'timed_out': timed_out,
+            'capped': capped,
+        }
+    )
@@ -0,0 +1,160 @@
+# Нагрузочные замеры представлений блога через тестовый клиент Django
+import math
+import random
+import subprocess
+import time
+from datetime import datetime, timezone
+
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .corpus import WORDS
+from .models import Post
+
+# Кеши отключаются целиком: замер показывает стоимость самих представлений
+NO_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга (values отсортированы)"""
+    if not values:
+        return None
+    rank = max(math.ceil(percent / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+def current_commit():
+    """Коммит, на котором сделан замер, - чтобы сравнивать результаты между коммитами"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sample_posts(rng, count):
+    """
+    Случайные опубликованные посты без ORDER BY random(): берётся первый пост
+    с id не меньше случайного в диапазоне [min(id), max(id)].
+    """
+    bounds = Post.published.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return []
+    posts = []
+    for _ in range(count):
+        start = rng.randint(bounds['low'], bounds['high'])
+        post = (
+            Post.published.filter(id__gte=start).order_by('id')
+            .only('id', 'slug', 'publish').first()
+        )
+        if post is not None:
+            posts.append(post)
+    return posts
+
+
+def endpoint_urls(seed=0, samples=20):
+    """URL для каждой точки замера; запросы к точке идут по её списку по кругу"""
+    rng = random.Random(seed)
+    posts = sample_posts(rng, samples)
+    endpoints = {
+        'post_list': [reverse('blog:post_list')],
+        'post_feed': [reverse('blog:post_feed')],
+        'post_search': [
+            reverse('blog:post_search') + f'?query={rng.choice(WORDS)}' for _ in range(samples)
+        ],
+        'sitemap_index': [reverse('blog_sitemap_index')],
+    }
+    if posts:
+        endpoints['post_detail'] = [post.get_absolute_url() for post in posts]
+        endpoints['sitemap_section'] = [
+            reverse('blog_sitemap_section', args=[post.publish.year, post.publish.month])
+            for post in posts
+        ]
+        tags = {tag.slug for post in posts for tag in post.tags.all()}
+        if tags:
+            endpoints['post_list_by_tag'] = [
+                reverse('blog:post_list_by_tag', args=[slug]) for slug in sorted(tags)
+            ]
+    return endpoints
+
+
+def measure(client, urls, requests, warmup=0):
+    """Выполняет запросы и возвращает задержки (мс), число запросов к БД и ошибки"""
+    for number in range(warmup):
+        client.get(urls[number % len(urls)])
+
+    latencies, queries, errors = [], [], 0
+    for number in range(requests):
+        url = urls[number % len(urls)]
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)  # Время генерации входит в замер
+            latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured))
+        if response.status_code != 200:
+            errors += 1
+    return latencies, queries, errors
+
+
+def summarize(latencies, queries, errors):
+    latencies = sorted(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'latency_ms': {
+            'min': round(latencies[0], 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p90': round(percentile(latencies, 90), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3),
+            'mean': round(sum(latencies) / len(latencies), 3),
+        },
+        'queries': {
+            'mean': round(sum(queries) / len(queries), 2),
+            'max': max(queries),
+        },
+    }
+
+
+def run(requests=50, warmup=5, seed=0, only=None, client=None):
+    """Прогоняет все точки замера и возвращает результат, готовый к записи в JSON"""
+    client = client or Client()
+    results = {}
+    for name, urls in endpoint_urls(seed).items():
+        if only and name not in only:
+            continue
+        results[name] = summarize(*measure(client, urls, requests, warmup))
+    return {
+        'commit': current_commit(),
+        'started': datetime.now(timezone.utc).isoformat(),
+        'posts': Post.objects.count(),
+        'published': Post.published.count(),
+        'requests': requests,
+        'warmup': warmup,
+        'seed': seed,
+        'endpoints': results,
+    }
+
+
+def compare(baseline, current):
+    """Изменение p50 и среднего числа запросов относительно прошлого замера"""
+    changes = {}
+    for name, result in current['endpoints'].items():
+        before = baseline.get('endpoints', {}).get(name)
+        if before is None:
+            continue
+        changes[name] = {
+            'p50_ratio': round(
+                result['latency_ms']['p50'] / max(before['latency_ms']['p50'], 1e-6), 3
+            ),
+            'queries_delta': round(result['queries']['mean'] - before['queries']['mean'], 2),
+        }
+    return changes
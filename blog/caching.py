@@ -0,0 +1,17 @@
+# Кеширование фрагментов и данных блога
+from django.conf import settings
+from django.core.cache import cache  # Кеш по умолчанию (backend задаётся в settings.CACHES)
+from django.core.cache.utils import make_template_fragment_key
+
+# Имя фрагмента {% cache %} с боковой панелью в base.html
+SIDEBAR_FRAGMENT = 'blog_sidebar'
+
+
+def sidebar_timeout():
+    """TTL кеша боковой панели - страховка на случай пропущенной инвалидации"""
+    return settings.BLOG_SIDEBAR_CACHE_TIMEOUT
+
+
+def invalidate_sidebar():
+    """Сбрасывает закешированную боковую панель"""
+    cache.delete(make_template_fragment_key(SIDEBAR_FRAGMENT))
@@ -0,0 +1,137 @@
+# Детерминированный синтетический корпус для нагрузочных замеров
+import random
+from datetime import datetime, timedelta, timezone
+
+from django.contrib.auth import get_user_model
+from django.db.models import Max
+from taggit.models import Tag
+
+from .models import Comment, Post
+from .transfer import Importer
+
+User = get_user_model()
+
+# Точка отсчёта дат: от неё корпус уходит в прошлое, поэтому при одном seed он одинаков
+BASE_DATE = datetime(2025, 1, 1, tzinfo=timezone.utc)
+PUBLISH_SPAN = timedelta(days=3 * 365)
+
+WORDS = (
+    'блог запись сервер запрос ответ база данных индекс кеш страница шаблон '
+    'модель поле таблица строка колонка миграция тест функция класс метод '
+    'объект список словарь очередь поток процесс память диск сеть задержка '
+    'нагрузка пользователь читатель автор комментарий тег поиск лента карта '
+    'сайт ссылка адрес версия выпуск ошибка исправление проверка настройка '
+    'параметр значение результат замер график отчёт система модуль пакет '
+    'быстрый медленный новый старый простой сложный большой малый важный '
+    'главный полный пустой первый последний общий отдельный открытый закрытый '
+    'читает пишет хранит отдаёт строит считает проверяет ускоряет кеширует '
+    'обновляет удаляет создаёт загружает выгружает ищет находит'
+).split()
+
+
+class CorpusGenerator:
+    """
+    Строит авторов, теги, посты с телом в Markdown и комментарии и загружает их
+    через Importer пачками. Одинаковый seed даёт одинаковые тексты, даты и связи.
+    """
+
+    def __init__(self, seed=0, paragraphs=5, comments_per_post=5, tags_per_post=3):
+        self.rng = random.Random(seed)
+        self.paragraphs = paragraphs
+        self.comments_per_post = comments_per_post
+        self.tags_per_post = tags_per_post
+
+    def sentence(self, low=6, high=14):
+        words = self.rng.choices(WORDS, k=self.rng.randint(low, high))
+        return ' '.join(words).capitalize() + '.'
+
+    def paragraph(self):
+        return ' '.join(self.sentence() for _ in range(self.rng.randint(2, 5)))
+
+    def markdown_body(self):
+        """Тело поста: заголовки, абзацы, выделение, код, список и цитата"""
+        parts = []
+        for number in range(self.paragraphs):
+            if number % 3 == 0:
+                parts.append('## ' + self.sentence(2, 5).rstrip('.'))
+            text = self.paragraph()
+            words = text.split(' ')
+            position = self.rng.randrange(len(words))
+            words[position] = f'**{words[position]}**'
+            parts.append(' '.join(words) + f' `{self.rng.choice(WORDS)}()`')
+        parts.append('\n'.join(f'- {self.sentence(2, 6)}' for _ in range(3)))
+        parts.append('> ' + self.sentence())
+        return '\n\n'.join(parts)
+
+    def generate(self, posts, authors=20, tags=50, batch_size=1000, progress=None):
+        """
+        Загружает корпус в БД. Id продолжают уже существующие, поэтому корпус
+        можно добавить к живым данным. Возвращает Importer (счётчики и скорость).
+        """
+        importer = Importer(batch_size)
+        first = {
+            model: (model.objects.aggregate(last=Max('id'))['last'] or 0) + 1
+            for model in (User, Tag, Post, Comment)
+        }
+
+        author_ids = range(first[User], first[User] + authors)
+        for author_id in author_ids:
+            importer.add_row('author', {
+                'id': author_id,
+                'username': f'synthetic{author_id}',
+                'email': f'synthetic{author_id}@example.com',
+                'password': '!',  # Непригодный пароль - войти под автором нельзя
+                'date_joined': BASE_DATE - PUBLISH_SPAN,
+            })
+
+        tag_ids = range(first[Tag], first[Tag] + tags)
+        for tag_id in tag_ids:
+            importer.add_row('tag', {
+                'id': tag_id, 'name': f'Тема {tag_id}', 'slug': f'tema-{tag_id}'
+            })
+
+        comment_id = first[Comment]
+        comments = []
+        for post_id in range(first[Post], first[Post] + posts):
+            publish = BASE_DATE - timedelta(
+                seconds=self.rng.randrange(int(PUBLISH_SPAN.total_seconds()))
+            )
+            importer.add_row('post', {
+                'id': post_id,
+                'title': self.sentence(3, 8).rstrip('.'),
+                'slug': f'post-{post_id}',
+                'author_id': self.rng.choice(author_ids),
+                'body': self.markdown_body(),
+                'publish': publish,
+                'created': publish,
+                'updated': publish + timedelta(minutes=self.rng.randrange(60 * 24 * 30)),
+                # Каждый десятый пост - черновик
+                'status': Post.Status.DRAFT if self.rng.random() < 0.1 else Post.Status.PUBLISHED,
+                'tags': self.rng.sample(tag_ids, min(self.tags_per_post, tags)),
+            })
+            for _ in range(self.rng.randint(0, self.comments_per_post)):
+                created = publish + timedelta(minutes=self.rng.randrange(60 * 24 * 60))
+                comments.append({
+                    'id': comment_id,
+                    'post_id': post_id,
+                    'name': f'Читатель {self.rng.randrange(1000)}',
+                    'email': 'reader@example.com',
+                    'body': self.paragraph(),
+                    'created': created,
+                    'updated': created,
+                    'active': self.rng.random() < 0.95,
+                })
+                comment_id += 1
+            # Комментарий сбрасывает буфер постов (см. Importer.add_row), поэтому
+            # комментарии копятся отдельно и передаются целой пачкой
+            if len(comments) >= batch_size:
+                for comment in comments:
+                    importer.add_row('comment', comment)
+                comments = []
+            if progress and (post_id - first[Post] + 1) % batch_size == 0:
+                progress(importer)
+
+        for comment in comments:
+            importer.add_row('comment', comment)
+        importer.finish()
+        return importer
@@ -0,0 +1,27 @@
+# Денормализованный счётчик активных комментариев Post.active_comments
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Post
+
+
+def adjust_active_comments(post_id, delta):
+    """Атомарно меняет счётчик на delta (UPDATE ... SET active_comments = active_comments + delta)"""
+    if delta:
+        Post.objects.filter(pk=post_id).update(
+            active_comments=F('active_comments') + delta
+        )
+
+
+def recount_active_comments(posts=None):
+    """Пересчитывает счётчики для queryset постов (по умолчанию - всех) одним UPDATE"""
+    if posts is None:
+        posts = Post.objects.all()
+    counts = (
+        Comment.objects.filter(post=OuterRef('pk'), active=True)
+        .order_by()
+        .values('post')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return posts.update(active_comments=Coalesce(Subquery(counts), 0))
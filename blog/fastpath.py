@@ -0,0 +1,120 @@
+# Короткий путь через MIDDLEWARE для анонимных читателей публичных страниц
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.auth import middleware as auth_middleware
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.messages import middleware as messages_middleware
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.sessions import middleware as session_middleware
+from django.urls import Resolver404, resolve
+from django.utils.cache import patch_vary_headers
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+# Атрибут запроса: middleware с SkippableMixin для него не выполняются
+LEAN_ATTR = 'blog_lean'
+
+ANONYMOUS_USER = AnonymousUser()
+
+
+async def anonymous_user():
+    return ANONYMOUS_USER
+
+
+def is_lean(request):
+    return getattr(request, LEAN_ATTR, False)
+
+
+def qualifies(request):
+    """
+    Анонимное чтение публичной страницы: GET/HEAD без сессии и без сообщений
+    в cookie, маршрут из BLOG_FAST_PATH_ROUTES. Остальные cookie (csrftoken)
+    не мешают: CsrfViewMiddleware на коротком пути работает как обычно.
+    """
+    if request.method not in SAFE_METHODS:
+        return False
+    cookies = request.COOKIES
+    if settings.SESSION_COOKIE_NAME in cookies or CookieStorage.cookie_name in cookies:
+        return False
+    return view_name(settings.ROOT_URLCONF, request.path_info) in settings.BLOG_FAST_PATH_ROUTES
+
+
+@lru_cache(maxsize=4096)
+def view_name(urlconf, path):
+    """
+    Имя маршрута по пути (None - маршрута нет). Обработчик всё равно разрешит путь
+    сам, поэтому повторный resolve() на каждом запросе съел бы выигрыш короткого пути.
+    """
+    try:
+        return resolve(path, urlconf).view_name
+    except Resolver404:
+        return None
+
+
+class FastPathMiddleware:
+    """
+    Помечает запросы, которым не нужны сессии, аутентификация и сообщения
+    (см. SkippableMixin), и выдаёт им анонимного пользователя без обращения
+    к сессии. Ставится перед первым из пропускаемых middleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def mark(self, request):
+        if settings.BLOG_FAST_PATH and qualifies(request):
+            setattr(request, LEAN_ATTR, True)
+            request.user = ANONYMOUS_USER
+            request.auser = anonymous_user
+            return True
+        return False
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        lean = self.mark(request)
+        response = self.get_response(request)
+        if lean:
+            # Как и на полном пути (сессия читается ради request.user): ответ зависит от cookie
+            patch_vary_headers(response, ('Cookie',))
+        return response
+
+    async def __acall__(self, request):
+        lean = self.mark(request)
+        response = await self.get_response(request)
+        if lean:
+            patch_vary_headers(response, ('Cookie',))
+        return response
+
+
+class SkippableMixin:
+    """
+    Middleware с этим миксином не выполняется для помеченных FastPathMiddleware
+    запросов: запрос сразу передаётся дальше по цепочке. Подходит только для
+    middleware без process_view/process_exception/process_template_response.
+    """
+
+    def __call__(self, request):
+        if is_lean(request):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+# Подклассы (а не обёртки): проверки admin ищут в MIDDLEWARE подклассы этих middleware
+class SessionMiddleware(SkippableMixin, session_middleware.SessionMiddleware):
+    pass
+
+
+class AuthenticationMiddleware(SkippableMixin, auth_middleware.AuthenticationMiddleware):
+    pass
+
+
+class MessageMiddleware(SkippableMixin, messages_middleware.MessageMiddleware):
+    pass
@@ -1,23 +1,139 @@
-import markdown
+import hashlib
+
+from asgiref.sync import markcoroutinefunction, sync_to_async
+from django.conf import settings
 from django.contrib.syndication.views import Feed
-from django.template.defaultfilters import truncatewords_html  # Импорт функции для обрезки текста
-from django.urls import reverse_lazy
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from taggit.models import Tag
+
 from .models import Post
 
+# Из чего складываются ETag и Last-Modified ленты (см. LatestPostsFeed.state)
+STATE_AGGREGATES = {'updated': Max('updated'), 'publish': Max('publish'), 'count': Count('id')}
+
 class LatestPostsFeed(Feed):
 
-    title= 'Мой блог'
-    link = reverse_lazy('blog:post_list')
     description = 'Последние обновления на сайте'
 
-    def items(self):
-        return Post.published.all()[:5]
-    
+    def __call__(self, request, *args, **kwargs):
+        # Валидаторы считаются по БД, а не по версии в кеше: LocMemCache у каждого
+        # процесса свой, и сброс из другого воркера или команды до него не дойдёт
+        etag, last_modified = self.validators(request, self.state(kwargs.get('tag_slug')))
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            key = f'blog:feed:{etag}'
+            cached = cache.get(key)
+            if cached is None:
+                response = self.render_feed(key, request, *args, **kwargs)
+            else:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+        return self.with_validators(response, etag, last_modified)
+
+    def state_queryset(self, tag_slug):
+        posts = Post.published.order_by()
+        if tag_slug:
+            posts = posts.filter(tags__slug=tag_slug)
+        return posts
+
+    def state(self, tag_slug=None):
+        """
+        Состояние опубликованных постов ленты: самые поздние updated и publish и
+        число постов (снятие с публикации и удаление не всегда сдвигают максимумы)
+        """
+        return self.state_queryset(tag_slug).aggregate(**STATE_AGGREGATES)
+
+    def validators(self, request, state):
+        """ETag и Last-Modified ленты по состоянию постов"""
+        etag = '"%s"' % hashlib.md5(
+            f'{state["updated"]}:{state["publish"]}:{state["count"]}:'
+            f'{request.path}:{settings.BLOG_FEED_LENGTH}'.encode()
+        ).hexdigest()
+        newest = max(filter(None, (state['updated'], state['publish'])), default=None)
+        return etag, int(newest.timestamp()) if newest else None
+
+    def with_validators(self, response, etag, last_modified):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def render_feed(self, key, request, *args, **kwargs):
+        """Строит XML ленты (запросы к БД) и кеширует его под ключом ETag"""
+        response = super().__call__(request, *args, **kwargs)
+        cache.set(
+            key,
+            (response.content, response['Content-Type']),
+            settings.BLOG_FEED_CACHE_TIMEOUT
+        )
+        return response
+
+    def get_object(self, request, tag_slug=None):
+        # Лента по тегу (/blog/feed/tag/<slug>/) или общая лента
+        if tag_slug:
+            return get_object_or_404(Tag, slug=tag_slug)
+        return None
+
+    def items(self, tag):
+        # Теги нужны для каждого элемента - загружаем их пачкой
+        posts = Post.published.prefetch_related('tags')
+        if tag:
+            posts = posts.filter(tags__in=[tag])
+        return posts[:settings.BLOG_FEED_LENGTH]
+
+    def title(self, tag):
+        if tag:
+            return f'Мой блог: {tag.name}'
+        return 'Мой блог'
+
+    def link(self, tag):
+        if tag:
+            return reverse('blog:post_list_by_tag', args=[tag.slug])
+        return reverse('blog:post_list')
+
     def item_title(self, item):
         return item.title
-    
+
     def item_description(self, item):
-        return truncatewords_html(markdown.markdown(item.body), 30)
-    
+        return item.excerpt_html  # Анонс отрендерен заранее при сохранении поста
+
+    def item_categories(self, item):
+        return [tag.name for tag in item.tags.all()]
+
     def item_pubdate(self, item):
-        return item.publish
\ No newline at end of file
+        return item.publish
+
+
+class AsyncLatestPostsFeed(LatestPostsFeed):
+    """
+    Лента для async-представлений: проверка ETag и отдача XML из кеша идут
+    без потока синхронного ORM, в него уходит только построение ленты.
+    """
+
+    def __init__(self):
+        super().__init__()
+        markcoroutinefunction(self)  # Django вызывает экземпляр как async-представление
+
+    async def __call__(self, request, *args, **kwargs):
+        state = await self.state_queryset(kwargs.get('tag_slug')).aaggregate(**STATE_AGGREGATES)
+        etag, last_modified = self.validators(request, state)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is None:
+            key = f'blog:feed:{etag}'
+            cached = await cache.aget(key)
+            if cached is None:
+                response = await sync_to_async(self.render_feed)(key, request, *args, **kwargs)
+            else:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+        return self.with_validators(response, etag, last_modified)
@@ -0,0 +1,95 @@
+# Отложенная запись комментариев: буфер PendingComment -> bulk_create в Comment
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .caching import invalidate_sidebar
+from .counters import adjust_active_comments
+from .models import Comment, PendingComment, Post
+from .page_cache import purge_post_detail
+
+
+def buffering_enabled():
+    return settings.BLOG_COMMENT_INGESTION == 'buffered'
+
+
+def buffer_full(limit):
+    """
+    В буфере не меньше limit строк. Вместо COUNT(*) по всей таблице (он дорожает
+    с ростом очереди, а это горячий путь записи) читается не больше limit id по индексу.
+    """
+    if limit <= 0:
+        return True
+    return PendingComment.objects.order_by().values('id')[limit - 1:limit].exists()
+
+
+def buffer_comment(post, cleaned_data):
+    """
+    Кладёт проверенный комментарий в буфер. Возвращает False, если буфер переполнен
+    (воркер не успевает) - тогда комментарий нужно записать напрямую.
+    """
+    if buffer_full(settings.BLOG_COMMENT_BUFFER_LIMIT):
+        return False
+    PendingComment.objects.create(
+        post_id=post.id,
+        name=cleaned_data['name'],
+        email=cleaned_data['email'],
+        body=cleaned_data['body'],
+    )
+    return True
+
+
+def move_to_comments(pending_ids):
+    """
+    Копирует строки буфера в blog_comment одним INSERT ... SELECT. created - время
+    отправки из буфера: bulk_create проставил бы auto_now_add и потребовал второй
+    записи каждой строки.
+    """
+    if not pending_ids:
+        return
+    qn = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {qn(Comment._meta.db_table)} '
+            '(post_id, name, email, body, created, updated, active) '
+            'SELECT post_id, name, email, body, created, NOW(), TRUE '
+            f'FROM {qn(PendingComment._meta.db_table)} WHERE id = ANY(%s) ORDER BY id',
+            [pending_ids],
+        )
+
+
+def flush_comments(batch_size):
+    """
+    Переносит одну пачку комментариев из буфера в blog_comment.
+    Запись идёт в обход модели Comment (без сигналов), поэтому счётчики и кеш обновляются здесь.
+    Возвращает количество перенесённых комментариев.
+    """
+    with transaction.atomic():
+        pending = list(
+            PendingComment.objects.select_for_update(skip_locked=True)
+            .only('id', 'post_id')[:batch_size]
+        )
+        if not pending:
+            return 0
+
+        # Посты могли удалить или снять с публикации, пока комментарий ждал в буфере
+        live = set(
+            Post.published.filter(
+                id__in={item.post_id for item in pending}
+            ).values_list('id', flat=True)
+        )
+        accepted = [item for item in pending if item.post_id in live]
+        move_to_comments([item.id for item in accepted])
+        PendingComment.objects.filter(id__in=[item.id for item in pending]).delete()
+
+        per_post = Counter(item.post_id for item in accepted)
+        for post_id, count in per_post.items():
+            adjust_active_comments(post_id, count)
+
+    # Страницы постов с новыми комментариями и боковая панель устарели
+    for post in Post.objects.filter(id__in=per_post).values('publish', 'slug'):
+        purge_post_detail(post['publish'], post['slug'])
+    if per_post:
+        invalidate_sidebar()
+    return len(pending)
@@ -0,0 +1,183 @@
+# Инструментирование запросов: SQL, время БД, шаблонов и фильтра markdown
+import json
+import logging
+import random
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.template.backends.django import DjangoTemplates
+from django.utils import timezone
+
+logger = logging.getLogger('blog.instrumentation')
+
+# Статистика текущего запроса; ContextVar переносится и в потоки sync_to_async
+_current = ContextVar('blog_request_stats', default=None)
+
+
+class RequestStats:
+    """Накопленные за один запрос замеры (время - в секундах)"""
+
+    def __init__(self):
+        self.queries = Counter()  # SQL-шаблон -> сколько раз выполнен
+        self.db_time = 0.0
+        self.timers = Counter()   # 'template', 'markdown' -> суммарное время
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    def suspected_n_plus_one(self):
+        """Один и тот же SQL (с разными параметрами), выполненный подозрительно часто"""
+        threshold = settings.BLOG_INSTRUMENTATION_N_PLUS_ONE
+        return [
+            {'sql': sql, 'count': count}
+            for sql, count in self.queries.most_common()
+            if count >= threshold
+        ]
+
+
+@contextmanager
+def timed(name):
+    """Добавляет время выполнения блока к таймеру name текущего запроса"""
+    stats = _current.get()
+    if stats is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.timers[name] += time.perf_counter() - started
+
+
+def record_query(execute, sql, params, many, context):
+    """execute_wrapper, установленный на каждое соединение с БД"""
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - started
+        stats.queries[sql] += 1
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    # Обёртка ставится один раз при открытии соединения и ничего не делает вне запроса
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate:
+    """Шаблон, время отрисовки которого попадает в замер 'template'"""
+
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        with timed('template'):
+            return self.template.render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """
+    Бэкенд шаблонов Django с замером отрисовки. {% include %} и теги включения
+    работают внутри внешнего шаблона, поэтому время не считается дважды.
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def server_timing(stats, total):
+    """Значение заголовка Server-Timing (длительности в миллисекундах)"""
+    metrics = [
+        f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries"',
+        f'tpl;dur={stats.timers["template"] * 1000:.1f};desc="templates"',
+        f'md;dur={stats.timers["markdown"] * 1000:.1f};desc="markdown filter"',
+        f'total;dur={total * 1000:.1f}',
+    ]
+    return ', '.join(metrics)
+
+
+class InstrumentationMiddleware:
+    """
+    Считает для каждого запроса SQL-запросы, время БД, шаблонов и фильтра markdown,
+    отдаёт их в Server-Timing и пишет выборочную строку JSONL в логгер
+    blog.instrumentation. Запросы с подозрением на N+1 записываются всегда.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not settings.BLOG_INSTRUMENTATION:
+            return self.get_response(request)
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, stats, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not settings.BLOG_INSTRUMENTATION:
+            return await self.get_response(request)
+
+        # Запросы ORM из потоков sync_to_async попадают в ту же статистику (контекст копируется)
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.report(request, response, stats, time.perf_counter() - started)
+
+    def report(self, request, response, stats, total):
+        """Добавляет Server-Timing и при необходимости пишет строку журнала"""
+        if settings.BLOG_SERVER_TIMING:
+            response['Server-Timing'] = server_timing(stats, total)
+
+        suspects = stats.suspected_n_plus_one()
+        if suspects or random.random() < settings.BLOG_INSTRUMENTATION_SAMPLE_RATE:
+            match = request.resolver_match
+            logger.info(json.dumps({
+                'time': timezone.now().isoformat(),
+                'method': request.method,
+                'path': request.path,
+                'view': match.view_name if match else None,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 2),
+                'db_ms': round(stats.db_time * 1000, 2),
+                'queries': stats.query_count,
+                'template_ms': round(stats.timers['template'] * 1000, 2),
+                'markdown_ms': round(stats.timers['markdown'] * 1000, 2),
+                'n_plus_one': suspects,
+            }, ensure_ascii=False))
+        return response
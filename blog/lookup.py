@@ -0,0 +1,77 @@
+# Поиск поста по URL /<год>/<месяц>/<день>/<slug>/ без функций над publish в SQL
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import aget_object_or_404, get_object_or_404
+from django.utils import timezone
+
+from .models import Post
+
+
+def day_range(year, month, day):
+    """Полуоткрытый интервал [начало дня, начало следующего дня) в текущем часовом поясе"""
+    try:
+        start = timezone.make_aware(datetime(year, month, day))
+        return start, start + timedelta(days=1)
+    except (ValueError, OverflowError):  # 9999-12-31 + 1 день и огромные годы из URL
+        raise Http404('Нет такой даты')
+
+
+def post_id_key(year, month, day, slug):
+    return f'blog:post_id:{year}-{month}-{day}:{slug}'
+
+
+def forget_post_id(publish, slug):
+    """Удаляет id поста из кеша по его дате публикации и slug (при правке и удалении)"""
+    if publish is not None and slug:
+        publish = timezone.localtime(publish)
+        cache.delete(post_id_key(publish.year, publish.month, publish.day, slug))
+
+
+def get_published_post(year, month, day, slug):
+    """
+    Опубликованный пост по дате и slug или 404. Id поста кешируется, поэтому
+    повторный запрос - одна выборка по первичному ключу. Без кеша - диапазон
+    по publish и slug по индексу (slug, publish), а не publish__year/__month/__day.
+    """
+    start, end = day_range(year, month, day)
+    key = post_id_key(year, month, day, slug)
+    post_id = cache.get(key)
+    if post_id is not None:
+        post = Post.published.filter(id=post_id).first()
+        # Пост могли переименовать или перенести - тогда ищем заново
+        if post is not None and post.slug == slug and start <= post.publish < end:
+            return post
+        cache.delete(key)
+
+    post = get_object_or_404(
+        Post.published,
+        slug=slug,
+        publish__gte=start,
+        publish__lt=end
+    )
+    cache.set(key, post.id, settings.BLOG_POST_ID_CACHE_TIMEOUT)
+    return post
+
+
+async def aget_published_post(year, month, day, slug):
+    """Асинхронный get_published_post (для async-представлений)"""
+    start, end = day_range(year, month, day)
+    key = post_id_key(year, month, day, slug)
+    post_id = await cache.aget(key)
+    if post_id is not None:
+        post = await Post.published.filter(id=post_id).afirst()
+        if post is not None and post.slug == slug and start <= post.publish < end:
+            return post
+        await cache.adelete(key)
+
+    post = await aget_object_or_404(
+        Post.published,
+        slug=slug,
+        publish__gte=start,
+        publish__lt=end
+    )
+    await cache.aset(key, post.id, settings.BLOG_POST_ID_CACHE_TIMEOUT)
+    return post
@@ -0,0 +1,68 @@
+# Нагрузочный замер представлений блога с записью результатов в JSON
+import json
+
+from django.core.management.base import BaseCommand
+from django.test.utils import (
+    override_settings, setup_test_environment, teardown_test_environment
+)
+
+from blog import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет задержки (процентили) и число запросов к БД для списка, поста, поиска, '
+        'ленты и карты сайта через тестовый клиент и пишет результат в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help='Запросов на каждую точку')
+        parser.add_argument('--warmup', type=int, default=5, help='Прогревочных запросов (не учитываются)')
+        parser.add_argument('--seed', type=int, default=0, help='Seed выбора постов и поисковых слов')
+        parser.add_argument(
+            '--endpoint',
+            action='append',
+            dest='endpoints',
+            help='Замерить только указанную точку (можно повторять)'
+        )
+        parser.add_argument(
+            '--with-cache',
+            action='store_true',
+            help='Использовать настроенный кеш (по умолчанию кеши отключены)'
+        )
+        parser.add_argument('--output', help='Файл для записи JSON (по умолчанию - стандартный вывод)')
+        parser.add_argument('--baseline', help='JSON прошлого замера для сравнения')
+
+    def handle(self, *args, **options):
+        setup_test_environment()  # Разрешает хост testserver и подменяет отправку почты
+
+        caches = {} if options['with_cache'] else {'CACHES': benchmark.NO_CACHE}
+        try:
+            with override_settings(**caches):
+                result = benchmark.run(
+                    requests=options['requests'],
+                    warmup=options['warmup'],
+                    seed=options['seed'],
+                    only=options['endpoints'],
+                )
+        finally:
+            teardown_test_environment()
+        result['cache'] = options['with_cache']
+
+        if options['baseline']:
+            with open(options['baseline'], encoding='utf-8') as baseline:
+                result['comparison'] = benchmark.compare(json.load(baseline), result)
+
+        data = json.dumps(result, ensure_ascii=False, indent=2)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as output:
+                output.write(data + '\n')
+        else:
+            self.stdout.write(data)
+
+        for name, endpoint in result['endpoints'].items():
+            latency = endpoint['latency_ms']
+            self.stderr.write(
+                f'{name}: p50 {latency["p50"]} мс, p99 {latency["p99"]} мс, '
+                f'запросов к БД {endpoint["queries"]["mean"]}, ошибок {endpoint["errors"]}'
+            )
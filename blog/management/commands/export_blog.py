@@ -0,0 +1,43 @@
+# Потоковый экспорт постов, комментариев, тегов и авторов в JSON Lines
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.transfer import export_lines
+
+
+class Command(BaseCommand):
+    help = 'Выгружает данные блога в JSON Lines (по объекту на строку) с постоянным расходом памяти'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output',
+            nargs='?',
+            default='-',
+            help='Файл для записи ("-" - стандартный вывод)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Строк, читаемых из БД за один запрос'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        output = options['output']
+        stream = None if output == '-' else open(output, 'w', encoding='utf-8')
+        rows = 0
+        try:
+            for line in export_lines(options['batch_size']):
+                if stream is None:
+                    # self.stdout, а не sys.stdout - вывод можно перехватить в call_command
+                    self.stdout.write(line, ending='')
+                else:
+                    stream.write(line)
+                rows += 1
+        finally:
+            if stream is not None:
+                stream.close()
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stderr.write(f'Выгружено строк: {rows} ({rows / elapsed:.0f} строк/с)')
@@ -0,0 +1,44 @@
+# Воркер, переносящий комментарии из буфера PendingComment в blog_comment
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from blog.ingest import flush_comments
+
+
+class Command(BaseCommand):
+    help = 'Записывает буферизованные комментарии пачками (INSERT ... SELECT из буфера)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Комментариев в одной пачке (по умолчанию BLOG_COMMENT_FLUSH_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, опрашивая буфер'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустого буфера в режиме --loop (секунды)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size'] or settings.BLOG_COMMENT_FLUSH_BATCH_SIZE
+        while True:
+            # Разбираем буфер, пока пачки не закончатся
+            while True:
+                flushed = flush_comments(batch_size)
+                if flushed:
+                    self.stdout.write(f'Записано комментариев: {flushed}')
+                else:
+                    break
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,50 @@
+# Генерация синтетического корпуса для нагрузочных замеров
+from django.core.management.base import BaseCommand
+
+from blog.corpus import CorpusGenerator
+
+
+class Command(BaseCommand):
+    help = 'Создаёт детерминированный синтетический корпус: авторы, теги, посты в Markdown, комментарии'
+
+    def add_arguments(self, parser):
+        parser.add_argument('posts', type=int, help='Количество постов')
+        parser.add_argument('--authors', type=int, default=20, help='Количество авторов')
+        parser.add_argument('--tags', type=int, default=50, help='Размер словаря тегов')
+        parser.add_argument('--tags-per-post', type=int, default=3, help='Тегов у каждого поста')
+        parser.add_argument(
+            '--comments-per-post',
+            type=int,
+            default=5,
+            help='Максимум комментариев у поста (фактическое число случайно от 0)'
+        )
+        parser.add_argument('--paragraphs', type=int, default=5, help='Абзацев в теле поста')
+        parser.add_argument('--seed', type=int, default=0, help='Один seed - один и тот же корпус')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Объектов в одном bulk_create')
+
+    def handle(self, *args, **options):
+        generator = CorpusGenerator(
+            seed=options['seed'],
+            paragraphs=options['paragraphs'],
+            comments_per_post=options['comments_per_post'],
+            tags_per_post=options['tags_per_post'],
+        )
+
+        def progress(importer):
+            self.stderr.write(
+                f'Постов: {importer.counts["post"]}, комментариев: {importer.counts["comment"]} '
+                f'({importer.rate():.0f} объектов/с)'
+            )
+
+        importer = generator.generate(
+            options['posts'],
+            authors=options['authors'],
+            tags=options['tags'],
+            batch_size=options['batch_size'],
+            progress=progress,
+        )
+        summary = ', '.join(f'{kind}: {count}' for kind, count in importer.counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано {summary} ({importer.rate():.0f} объектов/с). '
+            'Подборки похожих постов: python manage.py rebuild_related_posts'
+        ))
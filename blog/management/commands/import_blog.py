@@ -0,0 +1,50 @@
+# Потоковый импорт данных блога из JSON Lines
+import sys
+
+from django.core.management.base import BaseCommand
+
+from blog.transfer import Importer
+
+
+class Command(BaseCommand):
+    help = 'Загружает JSON Lines, созданный export_blog, пачками через bulk_create'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input',
+            nargs='?',
+            default='-',
+            help='Файл для чтения ("-" - стандартный ввод)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Объектов в одном bulk_create'
+        )
+        parser.add_argument(
+            '--ignore-conflicts',
+            action='store_true',
+            help='Пропускать объекты, уже существующие в БД'
+        )
+
+    def handle(self, *args, **options):
+        path = options['input']
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        importer = Importer(options['batch_size'], options['ignore_conflicts'])
+        try:
+            for number, line in enumerate(stream, 1):
+                if line.strip():
+                    importer.add(line)
+                if number % 10000 == 0:
+                    self.stderr.write(f'Прочитано строк: {number} ({importer.rate():.0f} объектов/с)')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+        importer.finish()
+
+        summary = ', '.join(f'{kind}: {count}' for kind, count in importer.counts.items())
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано {summary} ({importer.rate():.0f} объектов/с). '
+            'Подборки похожих постов: python manage.py rebuild_related_posts'
+        ))
@@ -0,0 +1,48 @@
+# Планировщик отложенной публикации постов
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from blog.scheduling import next_publish_time, publish_due_posts
+
+
+class Command(BaseCommand):
+    help = 'Публикует запланированные посты, дата публикации которых наступила'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=100,
+            help='Постов, публикуемых в одной транзакции'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, просыпаясь к ближайшей дате публикации'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=60.0,
+            help='Максимальная пауза между проверками в режиме --loop (секунды)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            while True:
+                posts = publish_due_posts(options['batch_size'])
+                for post in posts:
+                    self.stdout.write(f'Опубликован: {post.title} ({post.publish:%Y-%m-%d %H:%M})')
+                if len(posts) < options['batch_size']:
+                    break
+            if not options['loop']:
+                break
+            # Спим до ближайшей публикации, но не дольше interval: новый пост
+            # могут запланировать на более ранний срок
+            delay = options['interval']
+            upcoming = next_publish_time()
+            if upcoming is not None:
+                delay = min(delay, max((upcoming - timezone.now()).total_seconds(), 0))
+            time.sleep(delay)
@@ -0,0 +1,47 @@
+# Команда для полной пересборки таблицы похожих постов
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post, RelatedPost
+from blog.related import compute_related
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает предвычисленные подборки похожих постов для всего корпуса'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество постов, обрабатываемых в одной транзакции'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+
+        total = 0
+        last_id = 0
+        while True:
+            # Идём по id, чтобы не использовать OFFSET на больших таблицах
+            batch = list(
+                Post.published.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'status')[:batch_size]
+            )
+            if not batch:
+                break
+            rows = []
+            for post in batch:
+                rows.extend(compute_related(post))
+            # Подборки пачки заменяются в одной транзакции: читатели не видят их пустыми
+            with transaction.atomic():
+                RelatedPost.objects.filter(post__in=batch).delete()
+                RelatedPost.objects.bulk_create(rows, batch_size=batch_size)
+            total += len(batch)
+            last_id = batch[-1].id
+            self.stdout.write(f'Обработано постов: {total}')
+
+        # Подборки постов, снятых с публикации (у опубликованных они уже заменены)
+        RelatedPost.objects.exclude(post__status=Post.Status.PUBLISHED).delete()
+        self.stdout.write(self.style.SUCCESS(f'Подборки пересобраны для {total} постов'))
@@ -0,0 +1,29 @@
+# Команда для сверки денормализованных счётчиков комментариев
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from blog.counters import recount_active_comments
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает Post.active_comments по таблице комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Размер диапазона id постов, обновляемого одним UPDATE'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        max_id = Post.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        total = 0
+        # Короткие UPDATE по диапазонам id не держат блокировку на всю таблицу
+        for start in range(0, max_id + 1, batch_size):
+            total += recount_active_comments(
+                Post.objects.filter(id__gte=start, id__lt=start + batch_size)
+            )
+        self.stdout.write(self.style.SUCCESS(f'Счётчики пересчитаны для {total} постов'))
@@ -0,0 +1,28 @@
+# Команда для массового (пере)рендеринга Markdown у существующих постов
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+from blog.rendering import render_posts
+
+
+class Command(BaseCommand):
+    help = 'Заполняет body_html/excerpt_html у постов, чей HTML устарел или отсутствует'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество постов в одном bulk_update'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Перерендерить все посты, даже если хеш тела не изменился'
+        )
+
+    def handle(self, *args, **options):
+        total = render_posts(
+            Post.objects.all(), batch_size=options['batch_size'], force=options['force']
+        )
+        self.stdout.write(self.style.SUCCESS(f'Перерендерено постов: {total}'))
@@ -0,0 +1,48 @@
+# Фоновый воркер отправки писем из очереди OutgoingEmail
+import time
+
+from django.core.management.base import BaseCommand
+
+from blog.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Отправляет письма из очереди пачками через одно SMTP-соединение'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=None,
+            help='Писем в одной пачке (по умолчанию BLOG_OUTBOX_BATCH_SIZE)'
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=None,
+            help='Попыток до пометки письма как FAILED (по умолчанию BLOG_OUTBOX_MAX_ATTEMPTS)'
+        )
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Работать постоянно, опрашивая очередь'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5.0,
+            help='Пауза между опросами пустой очереди в режиме --loop (секунды)'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            # Разбираем очередь, пока пачки не закончатся
+            while True:
+                sent = send_pending(options['batch_size'], options['max_attempts'])
+                if sent:
+                    self.stdout.write(f'Отправлено писем: {sent}')
+                else:
+                    break
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
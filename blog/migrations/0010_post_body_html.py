@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:06
+
+from django.db import migrations, models
+
+from blog.rendering import render_posts
+
+
+def render_existing_posts(apps, schema_editor):
+    """Шаблоны и лента читают только сохранённый HTML - заполняем его у уже существующих постов"""
+    Post = apps.get_model('blog', 'Post')
+    render_posts(Post.objects.using(schema_editor.connection.alias))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_trigram_ext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='body_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='body_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='excerpt_html',
+            field=models.TextField(blank=True, editable=False),
+        ),
+        migrations.RunPython(render_existing_posts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_post_body_html'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RelatedPost',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('same_tags', models.PositiveIntegerField()),
+                ('related_publish', models.DateTimeField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='related_links', to='blog.post')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='blog.post')),
+            ],
+            options={
+                'ordering': ['-same_tags', '-related_publish'],
+                'indexes': [models.Index(fields=['post', '-same_tags', '-related_publish'], name='blog_relate_post_id_0da495_idx')],
+                'constraints': [models.UniqueConstraint(fields=('post', 'related'), name='blog_relatedpost_unique_pair')],
+            },
+        ),
+    ]
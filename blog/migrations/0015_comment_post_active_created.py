@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0014_post_active_comments'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'active', 'created'], name='blog_comment_post_active_idx'),
+        ),
+    ]
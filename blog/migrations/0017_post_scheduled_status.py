@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import Now
+
+
+def schedule_future_posts(apps, schema_editor):
+    # Уже "опубликованные" посты с датой в будущем ждут publish_scheduled
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.filter(status='PB', publish__gt=Now()).update(status='SC')
+
+
+def unschedule_posts(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.filter(status='SC').update(status='PB')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0016_pendingcomment'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='status',
+            field=models.CharField(choices=[('DF', 'Draft'), ('PB', 'Published'), ('SC', 'Scheduled')], default='DF', max_length=2),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['status', '-publish'], name='blog_post_status_publish'),
+        ),
+        migrations.RunPython(schedule_future_posts, unschedule_posts),
+    ]
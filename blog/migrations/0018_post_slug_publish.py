@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0017_post_scheduled_status'),
+        ('taggit', '0006_rename_taggeditem_content_type_object_id_taggit_tagg_content_8fc721_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['slug', 'publish'], include=('status',), name='blog_post_slug_publish'),
+        ),
+    ]
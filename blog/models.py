@@ -1,17 +1,26 @@
 # Импорт необходимых модулей Django
 from django.conf import settings  # Доступ к настройкам проекта
+from django.contrib.postgres.indexes import GinIndex  # GIN-индексы PostgreSQL
+from django.contrib.postgres.search import SearchVector, SearchVectorField  # Полнотекстовый поиск
 from django.db import models  # Базовые классы для моделей
 from django.utils import timezone  # Утилиты для работы с датой/временем
 from django.urls import reverse  # Генерация URL по имени маршрута
 from taggit.managers import TaggableManager
 
+from .rendering import render_post  # Рендеринг Markdown в сохраняемый HTML
+
 # Кастомный менеджер для опубликованных постов
 class PublishedManager(models.Manager):
     def get_queryset(self):
         """Переопределяет стандартный queryset, фильтруя только опубликованные посты"""
+        # Подсказка 'published' позволяет blog.routers.ReplicaRouter читать с реплики
+        queryset = self._queryset_class(
+            model=self.model, using=self._db, hints={**self._hints, 'published': True}
+        )
         return (
-            super().get_queryset()  # Базовый queryset
+            queryset
             .filter(status=Post.Status.PUBLISHED)  # Фильтр по статусу
+            .defer('search_vector')  # Поисковый вектор нужен только в WHERE/ORDER BY
         )
 # Модель поста блога
 class Post(models.Model):
@@ -22,6 +31,7 @@ class Post(models.Model):
     class Status(models.TextChoices):
         DRAFT = 'DF', 'Draft'  # Черновик (код, человекочитаемое имя)
         PUBLISHED = 'PB', 'Published'  # Опубликован
+        SCHEDULED = 'SC', 'Scheduled'  # Ждёт даты публикации (см. publish_scheduled)
 
     # Поля модели:
     title = models.CharField(max_length=250)  # Заголовок (макс. длина 250)
@@ -35,6 +45,14 @@ class Post(models.Model):
         related_name='blog_posts'  # Имя для обратной связи (user.blog_posts.all())
     )
     body = models.TextField()  # Основное содержимое поста
+    # Предварительно отрендеренный Markdown (обновляется только при изменении body)
+    body_html = models.TextField(blank=True, editable=False)  # Полный HTML поста
+    excerpt_html = models.TextField(blank=True, editable=False)  # Анонс (обрезанный HTML)
+    body_hash = models.CharField(
+        max_length=64,
+        blank=True,
+        editable=False  # SHA-256 исходного body, по которому отрендерен HTML
+    )
     publish = models.DateTimeField(
         default=timezone.now  # Дата публикации (по умолчанию сейчас)
     )
@@ -49,6 +67,17 @@ class Post(models.Model):
         choices=Status.choices,  # Ограниченные варианты из класса Status
         default=Status.DRAFT  # Значение по умолчанию
     )
+    # Количество активных комментариев (поддерживается сигналами через F-выражения)
+    active_comments = models.PositiveIntegerField(default=0, editable=False)
+    # Хранимый поисковый вектор: PostgreSQL пересчитывает его сам при изменении title/body
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='russian')  # Заголовок важнее
+            + SearchVector('body', weight='B', config='russian')  # Текст поста
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True  # Значение хранится в таблице (STORED) и индексируется
+    )
 
     # Менеджеры модели:
     objects = models.Manager()  # Стандартный менеджер (все записи)
@@ -59,12 +88,49 @@ class Post(models.Model):
         ordering = ['-publish']  # Сортировка по убыванию даты публикации
         indexes = [
             models.Index(fields=['-publish']),  # Индекс для оптимизации запросов
+            # Post.published (WHERE status ... ORDER BY publish DESC) и поиск
+            # запланированных постов (WHERE status = 'SC' AND publish <= now)
+            models.Index(fields=['status', '-publish'], name='blog_post_status_publish'),
+            # Страница поста: WHERE slug = ... AND publish >= ... AND publish < ... AND status = ...
+            # (status в INCLUDE - проверяется по индексу без чтения строки таблицы)
+            models.Index(fields=['slug', 'publish'], include=['status'], name='blog_post_slug_publish'),
+            GinIndex(fields=['search_vector'], name='blog_post_search_gin'),  # Полнотекстовый поиск
+            # "Наиболее комментируемые": WHERE status = ... ORDER BY active_comments DESC LIMIT n
+            models.Index(fields=['status', '-active_comments'], name='blog_post_most_commented'),
+            GinIndex(
+                fields=['title'],
+                name='blog_post_title_trgm',
+                opclasses=['gin_trgm_ops']  # Триграммный поиск по заголовку (pg_trgm)
+            ),
         ]
 
     def __str__(self):
         """Строковое представление объекта (админка, shell)"""
         return self.title
 
+    def apply_schedule(self):
+        """
+        Опубликованный пост с датой в будущем становится запланированным: его выпустит
+        команда publish_scheduled. Возвращает True, если статус изменился.
+        """
+        if self.status == self.Status.PUBLISHED and self.publish > timezone.now():
+            self.status = self.Status.SCHEDULED
+            return True
+        return False
+
+    def save(self, *args, **kwargs):
+        """Перерендеривает Markdown перед сохранением, если изменилось тело поста"""
+        extra_fields = set()
+        if render_post(self):
+            extra_fields |= {'body_html', 'excerpt_html', 'body_hash'}
+        if self.apply_schedule():
+            extra_fields.add('status')
+        update_fields = kwargs.get('update_fields')
+        if extra_fields and update_fields is not None:
+            # Сохраняем вычисленные поля вместе с явно указанными
+            kwargs['update_fields'] = {*update_fields, *extra_fields}
+        super().save(*args, **kwargs)
+
     def get_absolute_url(self):
         """Генерирует канонический URL для поста"""
         return reverse(
@@ -94,11 +160,92 @@ class Comment(models.Model):
         ordering = ['created']  # Сортировка по дате создания
         indexes = [
             models.Index(fields=['created']),  # Индекс для оптимизации
+            # Постраничная выдача активных комментариев поста по (created, id)
+            models.Index(
+                fields=['post', 'active', 'created'],
+                name='blog_comment_post_active_idx'
+            ),
         ]
 
     def __str__(self):
         """Строковое представление комментария"""
         return f'Comment by {self.name} on {self.post}'
+# Предвычисленные похожие посты (пересечение тегов)
+class RelatedPost(models.Model):
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='related_links'  # post.related_links - похожие посты для post
+    )
+    related = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='+'  # Обратная связь не нужна
+    )
+    same_tags = models.PositiveIntegerField()  # Количество общих тегов
+    related_publish = models.DateTimeField()  # Копия related.publish для сортировки по индексу
+
+    class Meta:
+        ordering = ['-same_tags', '-related_publish']
+        indexes = [
+            # Чтение топа похожих постов - один проход по индексу
+            models.Index(fields=['post', '-same_tags', '-related_publish']),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['post', 'related'],
+                name='blog_relatedpost_unique_pair'
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.post} -> {self.related} ({self.same_tags})'
+# Буфер принятых, но ещё не записанных комментариев (сбрасывается командой flush_comments)
+class PendingComment(models.Model):
+    # Без внешнего ключа и вторичных индексов: вставка в буфер максимально дешёвая
+    post_id = models.BigIntegerField()  # id поста (проверен представлением)
+    name = models.CharField(max_length=80)
+    email = models.EmailField()
+    body = models.TextField()
+    created = models.DateTimeField(auto_now_add=True)  # Время отправки комментария
+
+    class Meta:
+        ordering = ['id']
+
+    def __str__(self):
+        return f'Pending comment by {self.name} on post {self.post_id}'
+# Очередь исходящих писем (отправляется командой send_queued_mail)
+class OutgoingEmail(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = 'PN', 'Pending'  # Ожидает отправки (в том числе повторной)
+        SENT = 'ST', 'Sent'  # Отправлено
+        FAILED = 'FL', 'Failed'  # Исчерпаны попытки отправки
+
+    subject = models.CharField(max_length=255)  # Тема письма
+    message = models.TextField()  # Тело письма
+    from_email = models.CharField(max_length=254, blank=True)  # Пусто - DEFAULT_FROM_EMAIL
+    recipient = models.EmailField()  # Получатель
+    status = models.CharField(
+        max_length=2,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)  # Число попыток отправки
+    next_attempt = models.DateTimeField(default=timezone.now)  # Не отправлять раньше этого времени
+    last_error = models.TextField(blank=True)  # Текст последней ошибки SMTP
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True, blank=True)  # Время успешной отправки
+
+    class Meta:
+        ordering = ['next_attempt']
+        indexes = [
+            # Выборка очередной пачки: status = PENDING AND next_attempt <= now()
+            models.Index(fields=['status', 'next_attempt']),
+        ]
+
+    def __str__(self):
+        return f'{self.subject} -> {self.recipient}'
 #Ключевые особенности:
 # Кастомный менеджер PublishedManager:
 # Наследуется от models.Manager
@@ -0,0 +1,109 @@
+# Отложенная отправка писем через очередь OutgoingEmail
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutgoingEmail
+
+
+def outgoing_emails(subject, message, recipient_list, from_email=None):
+    return [
+        OutgoingEmail(
+            subject=subject,
+            message=message,
+            from_email=from_email or '',
+            recipient=recipient,
+        )
+        for recipient in recipient_list
+    ]
+
+
+def enqueue_mail(subject, message, recipient_list, from_email=None):
+    """Ставит письмо в очередь (по строке на получателя) - вызывается из представлений"""
+    OutgoingEmail.objects.bulk_create(
+        outgoing_emails(subject, message, recipient_list, from_email)
+    )
+
+
+async def aenqueue_mail(subject, message, recipient_list, from_email=None):
+    """
+    Асинхронный enqueue_mail: письмо только записывается в очередь, SMTP-соединение
+    открывает воркер send_queued_mail - цикл событий не блокируется отправкой.
+    """
+    await OutgoingEmail.objects.abulk_create(
+        outgoing_emails(subject, message, recipient_list, from_email)
+    )
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед повторной попыткой: base, 2*base, 4*base..."""
+    return timedelta(seconds=settings.BLOG_OUTBOX_RETRY_DELAY * 2 ** (attempts - 1))
+
+
+def mark_failed(email, error, now, max_attempts):
+    """Фиксирует неудачную попытку и планирует следующую или помечает письмо как FAILED"""
+    email.attempts += 1
+    email.last_error = str(error)
+    if email.attempts >= max_attempts:
+        email.status = OutgoingEmail.Status.FAILED
+    else:
+        email.next_attempt = now + retry_delay(email.attempts)
+
+
+def send_pending(batch_size=None, max_attempts=None):
+    """
+    Отправляет одну пачку писем из очереди через одно SMTP-соединение.
+    Возвращает количество успешно отправленных писем.
+    """
+    batch_size = batch_size or settings.BLOG_OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.BLOG_OUTBOX_MAX_ATTEMPTS
+    now = timezone.now()
+    sent = 0
+
+    with transaction.atomic():
+        # skip_locked позволяет запускать несколько воркеров параллельно
+        batch = list(
+            OutgoingEmail.objects.select_for_update(skip_locked=True)
+            .filter(status=OutgoingEmail.Status.PENDING, next_attempt__lte=now)
+            .order_by('next_attempt')[:batch_size]
+        )
+        if not batch:
+            return 0
+
+        connection = get_connection(fail_silently=False)
+        try:
+            connection.open()  # Одно TCP/TLS-рукопожатие на всю пачку
+        except (OSError, smtplib.SMTPException) as exc:
+            for email in batch:
+                mark_failed(email, exc, now, max_attempts)
+        else:
+            try:
+                for email in batch:
+                    message = EmailMessage(
+                        subject=email.subject,
+                        body=email.message,
+                        from_email=email.from_email or None,  # None - DEFAULT_FROM_EMAIL
+                        to=[email.recipient],
+                        connection=connection,
+                    )
+                    try:
+                        message.send()
+                    except (OSError, smtplib.SMTPException) as exc:
+                        mark_failed(email, exc, now, max_attempts)
+                    else:
+                        email.attempts += 1
+                        email.status = OutgoingEmail.Status.SENT
+                        email.sent = timezone.now()
+                        email.last_error = ''
+                        sent += 1
+            finally:
+                connection.close()
+
+        OutgoingEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt', 'last_error', 'sent']
+        )
+    return sent
@@ -0,0 +1,154 @@
+# Кеш готовых страниц для анонимных читателей
+import re
+from functools import wraps
+from urllib.parse import urlencode
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.urls import reverse
+
+# GET-параметры, от которых зависит содержимое страниц; остальные не попадают в ключ
+RELEVANT_PARAMS = ('page', 'cursor')
+
+# CSRF-токен в закешированной странице заменяется на токен текущего посетителя
+CSRF_INPUT = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = b'__csrf_token__'
+
+
+def list_version_key(tag_slug=None):
+    if tag_slug:
+        return f'blog:page:version:tag:{tag_slug}'
+    return 'blog:page:version:list'
+
+
+def current_version(key):
+    """Версия группы страниц: её смена делает все ключи группы недостижимыми"""
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, None)
+        version = cache.get(key, 1)
+    return version
+
+
+async def acurrent_version(key):
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, 1, None)
+        version = await cache.aget(key, 1)
+    return version
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, None)  # Ключ вытеснен - любая новая версия подходит
+
+
+def detail_key(path):
+    return f'blog:page:detail:{path}'
+
+
+def list_page_key(request, version):
+    params = urlencode(sorted(
+        (name, request.GET[name]) for name in RELEVANT_PARAMS if name in request.GET
+    ))
+    return f'blog:page:list:{version}:{request.path}?{params}'
+
+
+def page_key(request):
+    """
+    Ключ страницы: для списков - версия + путь + значимые параметры,
+    для поста - только путь (удаляется адресно при изменении поста).
+    """
+    match = request.resolver_match
+    if match.url_name == 'post_detail':
+        return detail_key(request.path)
+    version = current_version(list_version_key(match.kwargs.get('tag_slug')))
+    return list_page_key(request, version)
+
+
+async def apage_key(request):
+    match = request.resolver_match
+    if match.url_name == 'post_detail':
+        return detail_key(request.path)
+    version = await acurrent_version(list_version_key(match.kwargs.get('tag_slug')))
+    return list_page_key(request, version)
+
+
+def cached_response(request, cached):
+    content, content_type = cached
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+    return HttpResponse(content, content_type=content_type)
+
+
+def cache_entry(response):
+    """Что сохранить в кеш для ответа; None - ответ не кешируется"""
+    if response.status_code != 200 or response.streaming:
+        return None
+    # Токен посетителя в кеш не попадает - вместо него сохраняется заглушка
+    content = CSRF_INPUT.sub(rb'\1' + CSRF_PLACEHOLDER + rb'\2', response.content)
+    return content, response['Content-Type']
+
+
+def cache_page_for_anonymous(view):
+    """Кеширует ответ представления для анонимных GET-запросов (sync и async)"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if request.method not in ('GET', 'HEAD') or user.is_authenticated:
+                return await view(request, *args, **kwargs)
+
+            key = await apage_key(request)
+            cached = await cache.aget(key)
+            if cached is not None:
+                return cached_response(request, cached)
+
+            response = await view(request, *args, **kwargs)
+            entry = cache_entry(response)
+            if entry is not None:
+                await cache.aset(key, entry, settings.BLOG_PAGE_CACHE_TIMEOUT)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        key = page_key(request)
+        cached = cache.get(key)
+        if cached is not None:
+            return cached_response(request, cached)
+
+        response = view(request, *args, **kwargs)
+        entry = cache_entry(response)
+        if entry is not None:
+            cache.set(key, entry, settings.BLOG_PAGE_CACHE_TIMEOUT)
+        return response
+    return wrapper
+
+
+def post_detail_path(publish, slug):
+    return reverse(
+        'blog:post_detail',
+        args=[publish.year, publish.month, publish.day, slug]
+    )
+
+
+def purge_post_detail(publish, slug):
+    """Удаляет закешированную страницу поста по его дате публикации и slug"""
+    if publish is not None and slug:
+        cache.delete(detail_key(post_detail_path(publish, slug)))
+
+
+def purge_lists(tag_slugs=()):
+    """Сбрасывает страницы списка постов и страницы указанных тегов"""
+    bump_version(list_version_key())
+    for slug in tag_slugs:
+        bump_version(list_version_key(slug))
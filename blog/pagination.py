@@ -0,0 +1,162 @@
+# Курсорная (keyset) пагинация по ключу (поле даты, id)
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.db.models import Q
+
+
+# Диапазон id (BigAutoField)
+BIGINT_MIN, BIGINT_MAX = -2 ** 63, 2 ** 63 - 1
+
+
+class InvalidCursor(Exception):
+    """Курсор повреждён или не может быть разобран"""
+
+
+def encode_cursor(value, pk, direction):
+    """Упаковывает позицию (значение поля, id) и направление в непрозрачный токен"""
+    payload = json.dumps(
+        {'p': value.isoformat(), 'i': pk, 'd': direction},
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Распаковывает токен в кортеж (значение поля, id, direction)"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        direction = data['d']
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        pk = data['i']
+        # Только целое в диапазоне bigint: 1e400 (inf) или 10**30 не должны дойти до БД
+        if type(pk) is not int or not BIGINT_MIN <= pk <= BIGINT_MAX:
+            raise ValueError(pk)
+        return datetime.fromisoformat(data['p']), pk, direction
+    except (binascii.Error, ValueError, KeyError, TypeError, UnicodeDecodeError,
+            OverflowError) as exc:
+        raise InvalidCursor(token) from exc
+
+
+class CursorPage:
+    """Страница курсорной пагинации (аналог django.core.paginator.Page для шаблонов)"""
+    cursor_mode = True  # Признак для pagination.html
+
+    def __init__(self, object_list, has_next, has_previous, field='publish'):
+        self.object_list = object_list
+        self.field = field
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next:
+            last = self.object_list[-1]
+            return encode_cursor(getattr(last, self.field), last.pk, 'next')
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous:
+            first = self.object_list[0]
+            return encode_cursor(getattr(first, self.field), first.pk, 'prev')
+        return None
+
+
+class CursorPaginator:
+    """
+    Пагинатор без COUNT(*) и OFFSET: каждая страница - это диапазонный запрос
+    по индексу, поэтому глубокие страницы не замедляются.
+    Queryset упорядочивается по (field, id) - по убыванию (посты) или возрастанию (комментарии).
+    """
+
+    def __init__(self, queryset, per_page, field='publish', descending=True):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+        self.descending = descending
+
+    def position(self, cursor):
+        """Позиция из токена; пустой или неверный токен - первая страница"""
+        if cursor:
+            try:
+                return decode_cursor(cursor)
+            except InvalidCursor:
+                pass
+        return ()
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по токену; неверный токен даёт первую страницу"""
+        return self.page(*self.position(cursor))
+
+    async def aget_page(self, cursor=None):
+        """Асинхронный get_page (для async-представлений)"""
+        return await self.apage(*self.position(cursor))
+
+    def ordering(self, forward=True):
+        sign = '-' if self.descending == forward else ''
+        return [f'{sign}{self.field}', f'{sign}id']
+
+    def after(self, value, pk, forward=True):
+        """Условие "строго после позиции (value, pk)" в заданном направлении обхода"""
+        op = 'lt' if self.descending == forward else 'gt'
+        return (
+            Q(**{f'{self.field}__{op}': value})
+            | Q(**{self.field: value, f'id__{op}': pk})
+        )
+
+    def build_page(self, rows, has_next, has_previous):
+        return CursorPage(rows, has_next, has_previous, field=self.field)
+
+    def page_queryset(self, value=None, pk=None, direction='next'):
+        """Запрос строк страницы: per_page + 1, лишняя строка показывает, есть ли ещё страница"""
+        limit = self.per_page + 1
+        if value is None:
+            # Первая страница
+            return self.queryset.order_by(*self.ordering())[:limit]
+        # Предыдущая страница: идём в обратную сторону (результат разворачивается)
+        forward = direction == 'next'
+        return (
+            self.queryset.filter(self.after(value, pk, forward=forward))
+            .order_by(*self.ordering(forward=forward))[:limit]
+        )
+
+    def page_from_rows(self, rows, value=None, direction='next'):
+        """Страница из строк page_queryset; None - перед курсором ничего не осталось"""
+        has_more = len(rows) > self.per_page
+        if value is None:
+            return self.build_page(rows[:self.per_page], has_more, False)
+        if direction == 'next':
+            return self.build_page(rows[:self.per_page], has_more, True)
+        if not rows:
+            return None
+        return self.build_page(rows[:self.per_page][::-1], True, has_more)
+
+    def page(self, value=None, pk=None, direction='next'):
+        rows = list(self.page_queryset(value, pk, direction))
+        page = self.page_from_rows(rows, value, direction)
+        return page if page is not None else self.page()  # Это начало списка
+
+    async def apage(self, value=None, pk=None, direction='next'):
+        rows = [row async for row in self.page_queryset(value, pk, direction)]
+        page = self.page_from_rows(rows, value, direction)
+        return page if page is not None else await self.apage()
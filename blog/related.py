@@ -0,0 +1,87 @@
+# Предвычисление похожих постов по пересечению тегов
+from django.db import transaction
+from django.db.models import Count, Min
+
+from .models import Post, RelatedPost
+
+# Сколько похожих постов хранится (и показывается) для каждого поста
+RELATED_POSTS_LIMIT = 4
+
+
+def compute_related(post):
+    """
+    Считает топ похожих опубликованных постов для post одним агрегирующим запросом.
+    Возвращает несохранённые объекты RelatedPost, отсортированные по убыванию схожести.
+    """
+    if post.status != Post.Status.PUBLISHED:
+        return []  # Черновики не участвуют в подборке
+    tag_ids = post.tags.values_list('id', flat=True)
+    rows = (
+        Post.published.filter(tags__in=tag_ids)  # Посты с общими тегами
+        .exclude(id=post.id)  # Исключаем сам пост
+        .values('id', 'publish')
+        .annotate(same_tags=Count('tags'))  # Количество общих тегов
+        .order_by('-same_tags', '-publish')[:RELATED_POSTS_LIMIT]
+    )
+    return [
+        RelatedPost(
+            post_id=post.id,
+            related_id=row['id'],
+            same_tags=row['same_tags'],
+            related_publish=row['publish'],
+        )
+        for row in rows
+    ]
+
+
+def overlaps(post):
+    """Возвращает {id соседнего поста: количество общих тегов} для всех соседей post"""
+    if post.status != Post.Status.PUBLISHED:
+        return {}
+    tag_ids = post.tags.values_list('id', flat=True)
+    return dict(
+        Post.published.filter(tags__in=tag_ids)
+        .exclude(id=post.id)
+        .values('id')
+        .annotate(same_tags=Count('tags'))
+        .values_list('id', 'same_tags')
+        .order_by()
+    )
+
+
+def refresh_related(post):
+    """Пересчитывает сохранённый список похожих постов для одного поста"""
+    with transaction.atomic():
+        RelatedPost.objects.filter(post=post).delete()
+        RelatedPost.objects.bulk_create(compute_related(post))
+
+
+def refresh_related_incremental(post):
+    """
+    Обновляет подборки после изменения тегов, статуса или даты публикации post:
+    пересчитывается сам пост и только те соседи, чей топ мог измениться.
+    """
+    refresh_related(post)
+
+    # Соседи, у которых post уже в топе (мог выпасть или сменить позицию)
+    affected = set(
+        RelatedPost.objects.filter(related=post).values_list('post_id', flat=True)
+    )
+    # Соседи, в чей топ post может теперь попасть
+    scores = overlaps(post)
+    if scores:
+        tops = (
+            RelatedPost.objects.filter(post__in=list(scores))
+            .values('post')
+            .annotate(total=Count('id'), weakest=Min('same_tags'))
+            .values_list('post', 'total', 'weakest')
+            .order_by()
+        )
+        full = {pk: weakest for pk, total, weakest in tops if total >= RELATED_POSTS_LIMIT}
+        affected.update(
+            pk for pk, same in scores.items()
+            if pk not in full or same >= full[pk]
+        )
+
+    for neighbour in Post.objects.filter(id__in=affected).only('id', 'status'):
+        refresh_related(neighbour)
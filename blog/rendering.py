@@ -0,0 +1,69 @@
+# Конвейер рендеринга Markdown для постов блога
+import hashlib  # Хеширование исходного текста поста
+import threading  # Отдельный экземпляр рендерера на каждый поток
+
+import markdown
+from django.template.defaultfilters import truncatewords_html  # Обрезка HTML по словам
+
+# Количество слов в анонсе поста (список, RSS-лента)
+EXCERPT_WORDS = 30
+
+# Экземпляры markdown.Markdown не потокобезопасны, поэтому храним по одному на поток
+_local = threading.local()
+
+
+def get_renderer():
+    """Возвращает (и при первом вызове создаёт) рендерер Markdown текущего потока"""
+    renderer = getattr(_local, 'renderer', None)
+    if renderer is None:
+        renderer = markdown.Markdown()
+        _local.renderer = renderer
+    return renderer
+
+
+def render_markdown(text):
+    """Преобразует Markdown в HTML, переиспользуя рендерер потока"""
+    return get_renderer().reset().convert(text)
+
+
+def content_hash(text):
+    """SHA-256 исходного текста - ключ, по которому определяется необходимость перерендера"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def render_post(post, force=False):
+    """
+    Заполняет body_html, excerpt_html и body_hash поста.
+    Возвращает True, если HTML был перерендерен (тело поста изменилось).
+    """
+    digest = content_hash(post.body)
+    if not force and post.body_hash == digest:
+        return False  # Тело не менялось - сохранённый HTML актуален
+    post.body_html = render_markdown(post.body)
+    post.excerpt_html = truncatewords_html(post.body_html, EXCERPT_WORDS)
+    post.body_hash = digest
+    return True
+
+
+def render_posts(posts, batch_size=500, force=False):
+    """
+    Перерендеривает посты из queryset пачками по batch_size (bulk_update), не держа
+    весь queryset в памяти. Возвращает количество перерендеренных постов.
+    Работает и с историческими моделями миграций.
+    """
+    manager = posts.model._default_manager.db_manager(posts.db)
+    fields = ['body_html', 'excerpt_html', 'body_hash']
+    batch = []
+    total = 0
+    # Читаем только нужные колонки
+    for post in posts.only('id', 'body', 'body_hash').iterator(chunk_size=batch_size):
+        if render_post(post, force=force):
+            batch.append(post)
+        if len(batch) >= batch_size:
+            manager.bulk_update(batch, fields)
+            total += len(batch)
+            batch = []
+    if batch:
+        manager.bulk_update(batch, fields)
+        total += len(batch)
+    return total
@@ -0,0 +1,118 @@
+# Чтение опубликованного контента с реплик PostgreSQL
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Реплика, выбранная для текущего запроса; None - всё читается с основной БД
+_replica = ContextVar('blog_replica', default=None)
+
+# Ключ сессии: до этого момента (timestamp) сессия читает с основной БД
+PIN_SESSION_KEY = 'blog_primary_until'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRouter:
+    """
+    Отправляет на реплику только запросы Post.published (queryset с подсказкой
+    'published', см. PublishedManager) и только внутри HTTP-запроса, для которого
+    ReadReplicaMiddleware выбрала реплику. Связанные объекты (теги, автор,
+    комментарии) Django читает из той же БД, что и пост. Запись - всегда в основную БД.
+    """
+
+    def db_for_read(self, model, **hints):
+        if hints.get('published'):
+            return _replica.get()
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Пост, прочитанный с реплики, сохраняется в основную БД, а не туда, откуда пришёл
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная БД
+        databases = {DEFAULT_DB_ALIAS, *settings.BLOG_READ_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит с основной БД через репликацию
+        if db in settings.BLOG_READ_REPLICAS:
+            return False
+        return None
+
+
+def is_pinned(request):
+    """Сессия недавно что-то записала и должна видеть свои изменения без задержки репликации"""
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    return session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+async def ais_pinned(request):
+    session = getattr(request, 'session', None)
+    if session is None:
+        return False
+    return await session.aget(PIN_SESSION_KEY, 0) > time.time()
+
+
+def pin_to_primary(request):
+    """
+    Закрепляет сессию за основной БД на BLOG_REPLICA_PIN_SECONDS секунд:
+    автор комментария сразу видит его, даже если реплика отстаёт.
+    """
+    _replica.set(None)
+    if settings.BLOG_READ_REPLICAS:
+        request.session[PIN_SESSION_KEY] = time.time() + settings.BLOG_REPLICA_PIN_SECONDS
+
+
+async def apin_to_primary(request):
+    _replica.set(None)
+    if settings.BLOG_READ_REPLICAS:
+        await request.session.aset(
+            PIN_SESSION_KEY, time.time() + settings.BLOG_REPLICA_PIN_SECONDS
+        )
+
+
+class ReadReplicaMiddleware:
+    """
+    Выбирает одну реплику на весь запрос (чтения внутри запроса согласованы между собой).
+    Запросы с изменением данных и закреплённые сессии читают с основной БД.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def replica_for(self, request, pinned):
+        if settings.BLOG_READ_REPLICAS and request.method in SAFE_METHODS and not pinned:
+            return random.choice(settings.BLOG_READ_REPLICAS)
+        return None
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        pinned = bool(settings.BLOG_READ_REPLICAS) and is_pinned(request)
+        token = _replica.set(self.replica_for(request, pinned))
+        try:
+            return self.get_response(request)
+        finally:
+            _replica.reset(token)
+
+    async def __acall__(self, request):
+        pinned = bool(settings.BLOG_READ_REPLICAS) and await ais_pinned(request)
+        token = _replica.set(self.replica_for(request, pinned))
+        try:
+            return await self.get_response(request)
+        finally:
+            _replica.reset(token)
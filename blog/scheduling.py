@@ -0,0 +1,34 @@
+# Отложенная публикация: перевод запланированных постов в PUBLISHED в момент publish
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import Post
+
+
+def publish_due_posts(batch_size=100):
+    """
+    Публикует пачку запланированных постов, чья дата наступила. Пост сохраняется
+    через save(), поэтому срабатывают обычные сигналы: сброс кеша страниц и боковой
+    панели (до воркеров он доходит только через общий кеш, см. docs/production.md),
+    пересчёт похожих постов. Ленты видят пост сами - их ETag считается по БД.
+    Возвращает опубликованные посты.
+    """
+    with transaction.atomic():
+        # skip_locked: несколько планировщиков не опубликуют один пост дважды
+        due = list(
+            Post.objects.select_for_update(skip_locked=True)
+            .filter(status=Post.Status.SCHEDULED, publish__lte=timezone.now())
+            .order_by('publish')[:batch_size]
+        )
+        for post in due:
+            post.status = Post.Status.PUBLISHED
+            post.save(update_fields=['status', 'updated'])  # updated - для lastmod карты сайта
+    return due
+
+
+def next_publish_time():
+    """Дата ближайшей запланированной публикации или None"""
+    return Post.objects.filter(status=Post.Status.SCHEDULED).aggregate(
+        next=Min('publish')
+    )['next']
@@ -0,0 +1,83 @@
+# Поиск постов: ограниченная выборка, кеш ранжированных id и таймаут запроса
+import hashlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.core.cache import cache
+from django.db import OperationalError, connections, transaction
+
+from .models import Post
+
+
+def normalize_query(query):
+    """Приводит запрос к каноническому виду для ключа кеша: регистр и пробелы не важны"""
+    return ' '.join(query.lower().split())
+
+
+def cache_key(query):
+    digest = hashlib.sha1(query.encode('utf-8')).hexdigest()
+    return f'blog:search:{digest}'
+
+
+def ranked_ids(query):
+    """Возвращает не более BLOG_SEARCH_MAX_RESULTS id постов в порядке релевантности"""
+    limit = settings.BLOG_SEARCH_MAX_RESULTS
+    search_query = SearchQuery(query, config='russian')
+    # Полнотекстовый поиск по хранимому вектору (GIN-индекс)
+    ids = list(
+        Post.published.filter(search_vector=search_query)
+        .annotate(rank=SearchRank('search_vector', search_query))
+        .order_by('-rank', '-publish')
+        .values_list('id', flat=True)[:limit]
+    )
+    if ids:
+        return ids
+    # Запасной вариант для опечаток: триграммы по заголовку. Порог ниже, чем у оператора %
+    # из pg_trgm (0.3), иначе заголовки с опечаткой в длинном названии не находятся
+    return list(
+        Post.published.annotate(similarity=TrigramSimilarity('title', query))
+        .filter(similarity__gt=settings.BLOG_SEARCH_TRIGRAM_THRESHOLD)
+        .order_by('-similarity')
+        .values_list('id', flat=True)[:limit]
+    )
+
+
+def search_post_ids(query):
+    """
+    Возвращает (ids, timed_out). Результат кешируется на BLOG_SEARCH_CACHE_TIMEOUT секунд;
+    запрос к БД ограничен statement_timeout, чтобы тяжёлый поиск не занимал воркер.
+    """
+    query = normalize_query(query)
+    key = cache_key(query)
+    ids = cache.get(key)
+    if ids is not None:
+        return ids, False
+
+    db = Post.published.all().db  # Реплика или основная БД (см. blog.routers)
+    try:
+        with transaction.atomic(using=db):
+            with connections[db].cursor() as cursor:
+                # is_local=true: таймаут действует только до конца текущей транзакции
+                cursor.execute(
+                    "SELECT set_config('statement_timeout', %s, true)",
+                    [str(settings.BLOG_SEARCH_STATEMENT_TIMEOUT)]
+                )
+            ids = ranked_ids(query)
+    except OperationalError:
+        # Запрос отменён по таймауту - отдаём пустой результат и не кешируем его
+        return [], True
+
+    cache.set(key, ids, settings.BLOG_SEARCH_CACHE_TIMEOUT)
+    return ids, False
+
+
+async def asearch_post_ids(query):
+    """
+    Асинхронный search_post_ids: кешированный результат отдаётся без потока
+    синхронного ORM, поиск в БД (транзакция с таймаутом) выполняется в нём.
+    """
+    ids = await cache.aget(cache_key(normalize_query(query)))
+    if ids is not None:
+        return ids, False
+    return await sync_to_async(search_post_ids)(query)
@@ -0,0 +1,191 @@
+# Обработчики сигналов моделей блога
+from django.db import transaction
+from django.db.models.functions import Now
+from django.db.models.signals import (
+    m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save,
+)
+from django.dispatch import receiver
+
+from .caching import invalidate_sidebar
+from .counters import adjust_active_comments
+from .lookup import forget_post_id
+from .page_cache import purge_lists, purge_post_detail
+from taggit.models import Tag
+
+from .models import Comment, Post, RelatedPost
+from .related import refresh_related, refresh_related_incremental
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def reset_sidebar_cache(sender, **kwargs):
+    """Счётчики и списки в боковой панели устаревают при любом изменении постов/комментариев"""
+    invalidate_sidebar()
+
+
+@receiver(post_save, sender=Post)
+def update_related_on_save(sender, instance, created=False, raw=False, update_fields=None,
+                           **kwargs):
+    """Публикация, снятие с публикации или смена даты меняют подборки похожих постов"""
+    if raw:
+        return  # loaddata - подборки пересобираются командой rebuild_related_posts
+    if update_fields is not None and not {'status', 'publish'} & set(update_fields):
+        return
+    state = (instance.status, instance.publish)
+    if not created and state == instance._related_state:
+        return  # Правка текста или заголовка подборок не меняет
+    refresh_related_incremental(instance)
+    instance._related_state = state
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def update_related_on_tags(sender, instance, action, **kwargs):
+    """Изменение тегов поста пересчитывает его подборку и подборки соседей"""
+    if action in ('post_add', 'post_remove', 'post_clear') and isinstance(instance, Post):
+        refresh_related_incremental(instance)
+        # Теги выводятся в ленте как категории: сдвигаем updated, от которого считается ETag лент
+        Post.objects.filter(pk=instance.pk).update(updated=Now())
+
+
+@receiver(pre_delete, sender=Post)
+def update_related_on_delete(sender, instance, **kwargs):
+    """Посты, в чьих подборках был удаляемый пост, пересчитываются после коммита"""
+    neighbours = list(
+        RelatedPost.objects.filter(related=instance).values_list('post_id', flat=True)
+    )
+    if neighbours:
+        transaction.on_commit(lambda: [
+            refresh_related(post)
+            for post in Post.objects.filter(id__in=neighbours).only('id', 'status')
+        ])
+
+
+@receiver(post_init, sender=Comment)
+def remember_comment_state(sender, instance, **kwargs):
+    """
+    Запоминаем, учтён ли комментарий в счётчике поста на момент загрузки. Поля читаются
+    без дозагрузки отложенных: None - поле не загружено (см. load_comment_state)
+    """
+    fields = instance.__dict__
+    was_counted = fields.get('active') if instance.pk is not None else False
+    instance._counted = (was_counted, fields.get('post_id'))
+
+
+def counted_fields_saved(update_fields):
+    """Сохраняются ли поля, от которых зависит счётчик (update_fields - имена или attname)"""
+    return update_fields is None or bool({'active', 'post', 'post_id'} & set(update_fields))
+
+
+def load_comment_state(instance):
+    """Дочитывает из БД прежние active и post_id, если комментарий загружен без них"""
+    if instance.pk is None or None not in instance._counted:
+        return
+    row = Comment.objects.filter(pk=instance.pk).values_list('active', 'post_id').first()
+    if row:
+        instance._counted = row
+
+
+@receiver(pre_save, sender=Comment)
+def load_comment_state_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not counted_fields_saved(update_fields):
+        return
+    fields = instance.__dict__
+    old_post_id = instance._counted[1]
+    # Незагруженные поля не менялись: если active не трогали и пост тот же, счётчик не меняется
+    if 'active' not in fields and fields.get('post_id', old_post_id) == old_post_id:
+        return
+    load_comment_state(instance)
+
+
+@receiver(pre_delete, sender=Comment)
+def load_comment_state_on_delete(sender, instance, **kwargs):
+    load_comment_state(instance)
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Создание, (де)активация или перенос комментария меняют Post.active_comments"""
+    if raw:
+        return  # loaddata - счётчики пересчитываются командой reconcile_comment_counts
+    if not counted_fields_saved(update_fields):
+        return
+    was_counted, old_post_id = instance._counted
+    fields = instance.__dict__
+    active = fields.get('active', was_counted)
+    post_id = fields.get('post_id', old_post_id)
+    if active is None:
+        return  # active не загружен и не менялся, пост тот же
+    if was_counted and old_post_id != post_id:
+        adjust_active_comments(old_post_id, -1)
+        was_counted = False
+    adjust_active_comments(post_id, int(active) - int(was_counted))
+    instance._counted = (active, post_id)
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_on_delete(sender, instance, **kwargs):
+    was_counted, old_post_id = instance._counted
+    if was_counted:
+        adjust_active_comments(old_post_id, -1)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_url(sender, instance, **kwargs):
+    """
+    Запоминаем (без дозагрузки отложенных полей) дату и slug - по ним строится URL поста,
+    а также статус и дату - от них зависят подборки похожих постов
+    """
+    fields = instance.__dict__
+    instance._cached_url = (fields.get('publish'), fields.get('slug'))
+    instance._related_state = (fields.get('status'), fields.get('publish'))
+
+
+def post_tag_slugs(post):
+    return list(post.tags.values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Post)
+def purge_pages_on_save(sender, instance, raw=False, **kwargs):
+    """Сбрасываем страницу поста (по старому и новому URL), общий список и страницы его тегов"""
+    if raw:
+        return
+    purge_post_detail(*instance._cached_url)
+    purge_post_detail(instance.publish, instance.slug)
+    forget_post_id(*instance._cached_url)  # Старый URL больше не должен вести на пост
+    instance._cached_url = (instance.publish, instance.slug)
+    purge_lists(post_tag_slugs(instance))
+
+
+@receiver(pre_delete, sender=Post)
+def purge_pages_on_delete(sender, instance, **kwargs):
+    purge_post_detail(instance.publish, instance.slug)
+    forget_post_id(instance.publish, instance.slug)
+    purge_lists(post_tag_slugs(instance))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def purge_pages_on_tags(sender, instance, action, pk_set=None, **kwargs):
+    """Теги выводятся в списках: сбрасываем общий список и страницы затронутых тегов"""
+    if not isinstance(instance, Post):
+        return
+    if action == 'pre_clear':
+        purge_lists(post_tag_slugs(instance))
+    elif action in ('post_add', 'post_remove') and pk_set:
+        purge_lists(Tag.objects.filter(pk__in=pk_set).values_list('slug', flat=True))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def purge_pages_on_comment(sender, instance, raw=False, **kwargs):
+    """Комментарии видны только на странице поста - сбрасываем её"""
+    if raw:
+        return
+    # После удаления отложенный post_id уже не дочитать: он запомнен в load_comment_state
+    post_id = instance.__dict__.get('post_id', instance._counted[1])
+    if post_id is None:
+        post_id = instance.post_id
+    post = Post.objects.filter(pk=post_id).values('publish', 'slug').first()
+    if post:
+        purge_post_detail(post['publish'], post['slug'])
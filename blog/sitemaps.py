@@ -1,13 +1,151 @@
-from django.contrib.sitemaps import Sitemap
+# Карта сайта, разбитая на секции по месяцам публикации
+import hashlib
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from django.contrib.sites.shortcuts import get_current_site
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.db.models.functions import TruncMonth
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views.decorators.http import condition
+
 from .models import Post
 
-class PostSitemap(Sitemap):
-    changefreq = 'weekly'
-    priority = 0.9
+# Время жизни закешированного XML; ключ содержит ETag, поэтому устаревший XML не отдаётся
+SITEMAP_CACHE_TIMEOUT = 60 * 60 * 24
+CONTENT_TYPE = 'application/xml'
+
+
+def month_range(year, month):
+    """Полуоткрытый интервал [начало месяца, начало следующего месяца)"""
+    # Маршрут принимает любое целое: год 0, 10000+ или 9999-12 (следующий год) - 404
+    try:
+        start = datetime(year, month, 1)
+        if month == 12:
+            end = datetime(year + 1, 1, 1)
+        else:
+            end = datetime(year, month + 1, 1)
+        return timezone.make_aware(start), timezone.make_aware(end)
+    except (ValueError, OverflowError):
+        raise Http404('Нет такого месяца')
+
+
+def section_queryset(year=None, month=None):
+    posts = Post.published.all()
+    if year is not None:
+        start, end = month_range(year, month)
+        posts = posts.filter(publish__gte=start, publish__lt=end)
+    return posts
+
+
+def stamp(request, year=None, month=None):
+    """
+    Метка версии секции: max(updated) и количество постов (одним запросом, результат
+    запоминается на запросе). Количество нужно, чтобы удаление поста меняло ETag.
+    """
+    if not hasattr(request, '_sitemap_stamp'):
+        request._sitemap_stamp = section_queryset(year, month).aggregate(
+            last=Max('updated'), total=Count('id')
+        )
+    return request._sitemap_stamp
+
+
+def sitemap_etag(request, year=None, month=None):
+    data = stamp(request, year, month)
+    key = f'{year}-{month}:{data["last"]}:{data["total"]}'
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def sitemap_last_modified(request, year=None, month=None):
+    return stamp(request, year, month)['last']
+
+
+def detail_url_pattern():
+    """
+    Шаблон URL поста для str.format: reverse() выполняется один раз,
+    а не для каждой строки карты сайта.
+    """
+    url = reverse('blog:post_detail', args=[11111, 22222, 33333, 'slug-placeholder'])
+    url = url.replace('{', '{{').replace('}', '}}')
+    return (
+        url.replace('11111', '{year}')
+        .replace('22222', '{month}')
+        .replace('33333', '{day}')
+        .replace('slug-placeholder', '{slug}')
+    )
+
+
+def site_root(request):
+    return f'{request.scheme}://{get_current_site(request).domain}'
+
+
+def cached_or_built(key, chunks):
+    """
+    Отдаёт XML из кеша либо собирает и кеширует его. XML строится до возврата ответа:
+    чтение идёт с той же реплики, что и ETag (ReadReplicaMiddleware сбрасывает выбор
+    после ответа), и попадает в замеры InstrumentationMiddleware
+    """
+    xml = cache.get(key)
+    if xml is None:
+        xml = ''.join(chunks())
+        cache.set(key, xml, SITEMAP_CACHE_TIMEOUT)
+    return HttpResponse(xml, content_type=CONTENT_TYPE)
+
+
+@condition(etag_func=sitemap_etag, last_modified_func=sitemap_last_modified)
+def sitemap_index(request):
+    """Индекс карты сайта: по одной секции на каждый месяц с публикациями"""
+    root = site_root(request)
+    key = f'blog:sitemap:index:{root}:{sitemap_etag(request)}'
+
+    def chunks():
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        months = (
+            Post.published.annotate(month=TruncMonth('publish'))
+            .values('month')
+            .annotate(lastmod=Max('updated'))
+            .order_by('month')
+        )
+        for row in months.iterator():
+            url = reverse(
+                'blog_sitemap_section',
+                args=[row['month'].year, row['month'].month]
+            )
+            yield (
+                f'<sitemap><loc>{escape(root + url)}</loc>'
+                f'<lastmod>{row["lastmod"].date().isoformat()}</lastmod></sitemap>\n'
+            )
+        yield '</sitemapindex>\n'
+
+    return cached_or_built(key, chunks)
+
+
+@condition(etag_func=sitemap_etag, last_modified_func=sitemap_last_modified)
+def sitemap_section(request, year, month):
+    """Секция карты сайта за один месяц, построенная из .values() без создания моделей"""
+    root = site_root(request)
+    posts = section_queryset(year, month)  # Заодно проверяет корректность месяца
+    key = f'blog:sitemap:{year}-{month}:{root}:{sitemap_etag(request, year, month)}'
+
+    def chunks():
+        pattern = root + detail_url_pattern()
+        yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+        yield '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+        rows = posts.order_by('publish').values('slug', 'publish', 'updated')
+        for row in rows.iterator(chunk_size=2000):
+            publish = row['publish']
+            url = pattern.format(
+                year=publish.year, month=publish.month, day=publish.day, slug=row['slug']
+            )
+            yield (
+                f'<url><loc>{escape(url)}</loc>'
+                f'<lastmod>{row["updated"].date().isoformat()}</lastmod>'
+                '<changefreq>weekly</changefreq><priority>0.9</priority></url>\n'
+            )
+        yield '</urlset>\n'
 
-    def items(swlf):
-        return Post.published.all()
-    
-    def lastmod(self,obj):
-        return obj.updated
-    
+    return cached_or_built(key, chunks)
@@ -0,0 +1,173 @@
+# Статика с хешем в имени, заранее сжатые варианты (gzip/brotli) и их раздача
+import gzip
+import mimetypes
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+try:
+    import brotli  # Необязательная зависимость: без неё пишутся только .gz
+except ImportError:
+    brotli = None
+
+# Сжимаем только текстовые форматы (и .ico - это несжатый bitmap)
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.map', '.svg', '.txt', '.xml', '.json', '.html', '.ico')
+
+# Сжатый вариант сохраняется, только если он меньше оригинала хотя бы на 5%
+MIN_RATIO = 0.95
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+
+def compress(path):
+    """Пишет рядом с файлом path.gz и path.br (если доступен brotli)"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    variants = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants['.br'] = brotli.compress(data)
+    for suffix, compressed in variants.items():
+        if len(compressed) < len(data) * MIN_RATIO:
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    collectstatic копирует файлы с хешем содержимого в имени (css/blog.3f2a....css)
+    и записывает рядом сжатые варианты - на запросе сжимать ничего не нужно.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in {*paths, *self.hashed_files.values()}:
+            if name.endswith(COMPRESSIBLE_EXTENSIONS):
+                compress(self.path(name))
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding (без q=0)"""
+    encodings = set()
+    for item in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = item.partition(';')
+        params = params.replace(' ', '')
+        if params.startswith('q='):
+            try:
+                if float(params[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+class StaticFile:
+    """Файл из STATIC_ROOT и его сжатые варианты"""
+
+    # Порядок предпочтения: brotli компактнее gzip
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+    def __init__(self, path, immutable):
+        self.path = path
+        self.immutable = immutable
+        self.content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        stat = os.stat(path)
+        self.last_modified = stat.st_mtime
+        self.etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        self.variants = [
+            (encoding, path + suffix)
+            for encoding, suffix in self.ENCODINGS
+            if os.path.exists(path + suffix)
+        ]
+
+    def choose(self, request):
+        accepted = accepted_encodings(request)
+        for encoding, path in self.variants:
+            if encoding in accepted:
+                return encoding, path
+        return None, self.path
+
+    def response(self, request):
+        encoding, path = self.choose(request)
+        response = HttpResponse(content_type=self.content_type)
+        if request.method != 'HEAD':
+            with open(path, 'rb') as f:
+                response.content = f.read()
+        else:
+            response['Content-Length'] = os.path.getsize(path)
+        if encoding:
+            response['Content-Encoding'] = encoding
+        if self.variants:
+            response['Vary'] = 'Accept-Encoding'
+        if self.immutable:
+            response['Cache-Control'] = IMMUTABLE
+        else:
+            response['Cache-Control'] = f'public, max-age={settings.BLOG_STATIC_MAX_AGE}'
+        # ETag общий для всех вариантов: при смене кодировки содержимое то же
+        response['ETag'] = self.etag
+        response['Last-Modified'] = http_date(self.last_modified)
+        return get_conditional_response(
+            request, etag=self.etag, last_modified=int(self.last_modified), response=response
+        )
+
+
+def index_static_root():
+    """{URL: StaticFile} по содержимому STATIC_ROOT (после collectstatic)"""
+    root = settings.STATIC_ROOT
+    if not root or not os.path.isdir(root):
+        return {}
+    # Файлы с хешем в имени не меняются никогда - их можно кешировать навсегда
+    hashed = set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+    prefix = '/' + settings.STATIC_URL.lstrip('/')
+    files = {}
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            path = os.path.join(directory, filename)
+            name = os.path.relpath(path, root).replace(os.sep, '/')
+            files[prefix + name] = StaticFile(path, name in hashed)
+    return files
+
+
+class StaticFilesMiddleware:
+    """
+    Раздаёт STATIC_ROOT без похода в представления, сессии и БД (BLOG_SERVE_STATIC).
+    Список файлов строится один раз при старте процесса: новые файлы после
+    collectstatic появятся после перезапуска, как и новый манифест.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.files = index_static_root() if settings.BLOG_SERVE_STATIC else {}
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def static_file(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return None
+        return self.files.get(request.path_info)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        static_file = self.static_file(request)
+        if static_file is not None:
+            return static_file.response(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        static_file = self.static_file(request)
+        if static_file is not None:
+            return static_file.response(request)
+        return await self.get_response(request)
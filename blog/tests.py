@@ -1 +1,1389 @@
-# Create your tests here.
+import base64
+import gzip
+import importlib
+import io
+import json
+import os
+import re
+import shutil
+import socketserver
+import tempfile
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import TrigramSimilarity
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db import OperationalError, connection
+from django.core.management import call_command
+from django.http import Http404, HttpResponse
+from django.contrib.auth.models import AnonymousUser
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+from django.utils import timezone
+from taggit.models import Tag, TaggedItem
+
+from . import async_views, benchmark
+from .corpus import CorpusGenerator
+from .caching import SIDEBAR_FRAGMENT
+from .feeds import AsyncLatestPostsFeed
+from .ingest import flush_comments
+from .instrumentation import InstrumentationMiddleware
+from .lookup import get_published_post
+from .routers import PIN_SESSION_KEY, ReadReplicaMiddleware, pin_to_primary
+from .scheduling import publish_due_posts
+from .search import search_post_ids
+from .warmup import template_names, warm_up
+from .models import Comment, OutgoingEmail, PendingComment, Post, RelatedPost
+from .outbox import send_pending
+from .pagination import CursorPaginator, InvalidCursor, decode_cursor
+from .related import RELATED_POSTS_LIMIT, compute_related
+from .rendering import EXCERPT_WORDS, content_hash, render_markdown, render_posts
+
+
+# Кеш страниц и лент отключён: измеряется сама отрисовка
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0, BLOG_FEED_CACHE_TIMEOUT=0)
+class PostListQueryCountTests(TestCase):
+    """Количество запросов списка постов не должно зависеть от числа постов на странице"""
+
+    tags = ['django', 'python', 'postgres']
+
+    def setUp(self):
+        cache.clear()  # Боковая панель кешируется - начинаем с чистого кеша
+
+    def create_posts(self, count):
+        start = Post.objects.count()
+        for i in range(start, start + count):
+            # У каждого поста свой автор и несколько тегов
+            author = User.objects.create(username=f'author{i}')
+            post = Post.objects.create(
+                title=f'Post {i}',
+                slug=f'post-{i}',
+                author=author,
+                body='Текст поста',
+                status=Post.Status.PUBLISHED,
+            )
+            post.tags.add(*self.tags)
+
+    def count_queries(self, url):
+        self.client.get(url)  # Прогреваем кеш боковой панели
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx)
+
+    def test_post_list_query_count_is_constant(self):
+        url = reverse('blog:post_list')
+        self.create_posts(1)
+        one_post = self.count_queries(url)
+        self.create_posts(5)
+        full_page = self.count_queries(url)
+        self.assertEqual(one_post, full_page)
+        # Посты с авторами и теги страницы (курсорная пагинация обходится без COUNT)
+        self.assertEqual(full_page, 2)
+
+    def test_post_list_by_tag_query_count_is_constant(self):
+        url = reverse('blog:post_list_by_tag', args=['django'])
+        self.create_posts(1)
+        one_post = self.count_queries(url)
+        self.create_posts(5)
+        self.assertEqual(one_post, self.count_queries(url))
+
+    def test_feed_query_count_is_constant(self):
+        url = reverse('blog:post_feed')
+        self.create_posts(1)
+        one_post = self.count_queries(url)
+        self.create_posts(5)
+        self.assertEqual(one_post, self.count_queries(url))
+
+
+class CursorPaginatorTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author')
+        publish = timezone.now()
+        # Часть постов с одинаковой датой публикации - порядок решает id
+        for i in range(7):
+            Post.objects.create(
+                title=f'Post {i}',
+                slug=f'post-{i}',
+                author=author,
+                body='Текст',
+                publish=publish - timedelta(days=i // 2),
+                status=Post.Status.PUBLISHED,
+            )
+        cls.expected = list(Post.published.order_by('-publish', '-id'))
+
+    def test_walks_forward_and_back(self):
+        paginator = CursorPaginator(Post.published.all(), 3)
+        pages = [paginator.get_page()]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([post for page in pages for post in page], self.expected)
+        self.assertFalse(pages[0].has_previous())
+
+        previous = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(list(previous), list(pages[-2]))
+
+    def test_invalid_cursor_returns_first_page(self):
+        paginator = CursorPaginator(Post.published.all(), 3)
+        page = paginator.get_page('not-a-cursor')
+        self.assertEqual(list(page), self.expected[:3])
+
+    def test_out_of_range_ids_are_invalid(self):
+        for raw_id in ['1e400', '1' + '0' * 30, '"7"', 'true']:
+            payload = f'{{"p":"2024-01-01T00:00:00+00:00","i":{raw_id},"d":"next"}}'
+            token = base64.urlsafe_b64encode(payload.encode()).decode()
+            with self.subTest(raw_id=raw_id), self.assertRaises(InvalidCursor):
+                decode_cursor(token)
+        response = self.client.get(reverse('blog:post_list'), {'cursor': token})
+        self.assertEqual(response.status_code, 200)
+
+
+class StandInSMTPHandler(socketserver.StreamRequestHandler):
+    """Минимальный SMTP-сервер: принимает письма и отклоняет адреса bounce@..."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 localhost stand-in')
+        while line := self.rfile.readline():
+            command = line.decode().strip()
+            verb = command.split(' ', 1)[0].upper()
+            if verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                body = []
+                while (data := self.rfile.readline()) not in (b'.\r\n', b''):
+                    body.append(data)
+                self.server.messages.append(b''.join(body))
+                self.reply('250 OK')
+            elif verb == 'RCPT' and 'bounce@' in command:
+                self.reply('550 No such user')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:  # EHLO, MAIL, RCPT, RSET, NOOP
+                self.reply('250 OK')
+
+
+class StandInSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), StandInSMTPHandler)
+        self.connections = 0
+        self.messages = []
+
+
+class OutboxTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            title='Пост',
+            slug='post',
+            author=author,
+            body='Текст',
+            status=Post.Status.PUBLISHED,
+        )
+
+    def setUp(self):
+        self.smtp = StandInSMTPServer()
+        threading.Thread(target=self.smtp.serve_forever, daemon=True).start()
+        self.addCleanup(self.smtp.server_close)
+        self.addCleanup(self.smtp.shutdown)
+        settings = override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=self.smtp.server_address[1],
+            EMAIL_USE_TLS=False,
+            EMAIL_HOST_USER='',
+            EMAIL_HOST_PASSWORD='',
+            BLOG_OUTBOX_MAX_ATTEMPTS=2,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def share(self, to):
+        return self.client.post(
+            reverse('blog:post_share', args=[self.post.id]),
+            {'name': 'Иван', 'email': 'ivan@example.com', 'to': to},
+        )
+
+    def test_share_only_queues_mail(self):
+        response = self.share('friend@example.com')
+        self.assertContains(response, 'успешно отправлено')
+        self.assertEqual(self.smtp.connections, 0)
+        self.assertEqual(
+            OutgoingEmail.objects.get().status, OutgoingEmail.Status.PENDING
+        )
+
+    def test_batch_is_sent_over_one_connection(self):
+        for i in range(3):
+            self.share(f'friend{i}@example.com')
+        call_command('send_queued_mail', stdout=open(os.devnull, 'w'))
+        self.assertEqual(len(self.smtp.messages), 3)
+        self.assertEqual(self.smtp.connections, 1)
+        self.assertFalse(
+            OutgoingEmail.objects.exclude(status=OutgoingEmail.Status.SENT).exists()
+        )
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        self.share('bounce@example.com')
+        self.assertEqual(send_pending(), 0)
+        email = OutgoingEmail.objects.get()
+        self.assertEqual(email.status, OutgoingEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt, timezone.now())
+        self.assertEqual(send_pending(), 0)  # Время повтора ещё не наступило
+
+        OutgoingEmail.objects.update(next_attempt=timezone.now())
+        send_pending()
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.Status.FAILED)
+
+
+class AnonymousPageCacheTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            title='Пост',
+            slug='post',
+            author=author,
+            body='Текст',
+            status=Post.Status.PUBLISHED,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_anonymous_page_is_served_from_cache(self):
+        url = self.post.get_absolute_url()
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertContains(response, 'Пост')
+
+    def test_cached_page_gets_visitor_csrf_token(self):
+        url = self.post.get_absolute_url()
+        self.client.get(url)
+        visitor = self.client_class(enforce_csrf_checks=True)
+        response = visitor.get(url)
+        token = re.search(
+            r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()
+        ).group(1)
+        response = visitor.post(
+            reverse('blog:post_comment', args=[self.post.id]),
+            {
+                'name': 'Гость',
+                'email': 'guest@example.com',
+                'body': 'Комментарий',
+                'csrfmiddlewaretoken': token,
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_comment_purges_post_page(self):
+        url = self.post.get_absolute_url()
+        self.client.get(url)
+        Comment.objects.create(
+            post=self.post, name='Гость', email='guest@example.com', body='Новый комментарий'
+        )
+        self.assertContains(self.client.get(url), 'Новый комментарий')
+
+    def test_post_save_purges_list_and_tag_pages(self):
+        self.post.tags.add('django')
+        list_url = reverse('blog:post_list')
+        tag_url = reverse('blog:post_list_by_tag', args=['django'])
+        self.client.get(list_url)
+        self.client.get(tag_url)
+        self.post.title = 'Новый заголовок'
+        self.post.save()
+        self.assertContains(self.client.get(list_url), 'Новый заголовок')
+        self.assertContains(self.client.get(tag_url), 'Новый заголовок')
+
+
+class TransferTests(TestCase):
+    """export_blog -> import_blog в пустую БД восстанавливает данные без изменений"""
+
+    def test_round_trip(self):
+        author = User.objects.create_user('author', 'author@example.com', 'secret-password')
+        for i in range(5):
+            post = Post.objects.create(
+                title=f'Пост {i}',
+                slug=f'post-{i}',
+                author=author,
+                body=f'**Текст {i}**',
+                status=Post.Status.PUBLISHED,
+            )
+            post.tags.add('django', f'tag-{i}')
+            Comment.objects.create(post=post, name='Гость', email='guest@example.com', body='Текст')
+
+        posts_fields = ['id', 'title', 'created', 'updated', 'body_html', 'active_comments']
+        posts = list(Post.objects.order_by('id').values_list(*posts_fields))
+        tags = sorted(TaggedItem.objects.values_list('object_id', 'tag__slug'))
+        exported = io.StringIO()
+        call_command('export_blog', batch_size=2, stdout=exported, stderr=io.StringIO())
+
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Tag.objects.all().delete()
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8') as dump:
+            dump.write(exported.getvalue())
+            dump.flush()
+            call_command(
+                'import_blog', dump.name, batch_size=2, stdout=io.StringIO(), stderr=io.StringIO()
+            )
+
+        self.assertEqual(list(Post.objects.order_by('id').values_list(*posts_fields)), posts)
+        self.assertEqual(sorted(TaggedItem.objects.values_list('object_id', 'tag__slug')), tags)
+        self.assertEqual(Comment.objects.count(), 5)
+        # Последовательности id сдвинуты за импортированные строки
+        Post.objects.create(title='Новый', slug='new', author=User.objects.get(), body='Текст')
+
+    def test_export_has_no_credentials(self):
+        author = User.objects.create_user('author', 'author@example.com', 'secret-password')
+        Post.objects.create(title='Пост', slug='post', author=author, body='Текст')
+        password_hash = author.password
+        exported = io.StringIO()
+        call_command('export_blog', stdout=exported, stderr=io.StringIO())
+        self.assertNotIn(password_hash, exported.getvalue())
+        self.assertNotIn('author@example.com', exported.getvalue())
+
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8') as dump:
+            dump.write(exported.getvalue())
+            dump.flush()
+            call_command('import_blog', dump.name, stdout=io.StringIO(), stderr=io.StringIO())
+        imported = User.objects.get(username='author')
+        self.assertFalse(imported.has_usable_password())
+        self.assertEqual(imported.email, '')
+
+    def test_ignore_conflicts_leaves_existing_rows_alone(self):
+        author = User.objects.create(username='author')
+        kept, dropped = [
+            Post.objects.create(title=f'Пост {i}', slug=f'post-{i}', author=author, body='Текст',
+                                status=Post.Status.PUBLISHED)
+            for i in range(2)
+        ]
+        kept.tags.add('django')
+        dropped.tags.add('python')
+        dropped.refresh_from_db()  # Изменение тегов сдвигает updated
+        exported = io.StringIO()
+        call_command('export_blog', stdout=exported, stderr=io.StringIO())
+
+        dropped_id = dropped.id
+        dropped.delete()
+        # Уже существующий пост изменился после экспорта
+        kept.tags.set(['postgres'])
+        Post.objects.filter(id=kept.id).update(updated=timezone.now() + timedelta(days=1))
+        kept_updated = Post.objects.get(id=kept.id).updated
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', encoding='utf-8') as dump:
+            dump.write(exported.getvalue())
+            dump.flush()
+            call_command('import_blog', dump.name, ignore_conflicts=True,
+                         stdout=io.StringIO(), stderr=io.StringIO())
+
+        self.assertEqual(Post.objects.get(id=kept.id).updated, kept_updated)
+        self.assertEqual(list(Post.objects.get(id=kept.id).tags.names()), ['postgres'])
+        restored = Post.objects.get(id=dropped_id)
+        self.assertEqual((restored.created, restored.updated), (dropped.created, dropped.updated))
+        self.assertEqual(list(restored.tags.names()), ['python'])
+
+
+class CorpusBenchmarkTests(TestCase):
+
+    def corpus(self):
+        return list(Post.objects.order_by('id').values_list('title', 'body', 'publish', 'status'))
+
+    def test_corpus_is_deterministic(self):
+        CorpusGenerator(seed=7).generate(10, authors=2, tags=5, batch_size=4)
+        first = self.corpus()
+        self.assertEqual(len(first), 10)
+        self.assertTrue(Comment.objects.exists())
+
+        Post.objects.all().delete()
+        User.objects.all().delete()
+        Tag.objects.all().delete()
+        CorpusGenerator(seed=7).generate(10, authors=2, tags=5, batch_size=4)
+        self.assertEqual(self.corpus(), first)
+
+    @override_settings(CACHES=benchmark.NO_CACHE)
+    def test_benchmark_covers_endpoints(self):
+        CorpusGenerator().generate(20, authors=2, tags=5)
+        result = benchmark.run(requests=3, warmup=1)
+        self.assertEqual(
+            set(result['endpoints']),
+            {'post_list', 'post_list_by_tag', 'post_detail', 'post_search',
+             'post_feed', 'sitemap_index', 'sitemap_section'}
+        )
+        for endpoint in result['endpoints'].values():
+            self.assertEqual(endpoint['errors'], 0)
+            self.assertEqual(endpoint['requests'], 3)
+            self.assertGreater(endpoint['queries']['mean'], 0)
+
+
+class InstrumentationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author')
+        for i in range(6):
+            Post.objects.create(
+                title=f'Пост {i}', slug=f'post-{i}', author=author, body='Текст',
+                status=Post.Status.PUBLISHED,
+            )
+
+    @override_settings(CACHES=benchmark.NO_CACHE)
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('blog:post_list'))
+        timing = response['Server-Timing']
+        for metric in ('db;', 'tpl;', 'md;', 'total;'):
+            self.assertIn(metric, timing)
+        self.assertRegex(timing, r'desc="[1-9]\d* queries"')
+
+    @override_settings(CACHES=benchmark.NO_CACHE, BLOG_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        response = self.client.get(reverse('blog:post_list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(BLOG_INSTRUMENTATION_SAMPLE_RATE=0, BLOG_INSTRUMENTATION_N_PLUS_ONE=5)
+    def test_repeated_queries_are_logged_as_n_plus_one(self):
+        def view(request):
+            # Автор загружается отдельным запросом для каждого поста
+            names = [post.author.username for post in Post.objects.all()]
+            return HttpResponse(', '.join(names))
+
+        middleware = InstrumentationMiddleware(view)
+        with self.assertLogs('blog.instrumentation', 'INFO') as logs:
+            middleware(RequestFactory().get('/'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual(line['queries'], 7)
+        self.assertEqual(len(line['n_plus_one']), 1)
+        self.assertEqual(line['n_plus_one'][0]['count'], 6)
+
+    @override_settings(BLOG_INSTRUMENTATION_SAMPLE_RATE=0)
+    def test_unsampled_request_without_n_plus_one_is_not_logged(self):
+        middleware = InstrumentationMiddleware(lambda request: HttpResponse(Post.objects.count()))
+        with self.assertNoLogs('blog.instrumentation', 'INFO'):
+            middleware(RequestFactory().get('/'))
+
+
+@override_settings(BLOG_READ_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    """Маршрутизация проверяется по queryset.db - сами запросы к реплике не выполняются"""
+
+    def route(self, request):
+        def view(request):
+            return HttpResponse(Post.published.all().db)
+        return ReadReplicaMiddleware(view)(request).content.decode()
+
+    def anonymous_get(self):
+        request = RequestFactory().get('/')
+        request.session = {}
+        return request
+
+    def test_public_get_reads_published_from_replica(self):
+        self.assertEqual(self.route(self.anonymous_get()), 'replica')
+
+    def test_other_queries_and_writes_use_primary(self):
+        def view(request):
+            return HttpResponse(f'{Post.objects.all().db} {Comment.objects.all().db}')
+        response = ReadReplicaMiddleware(view)(self.anonymous_get())
+        self.assertEqual(response.content.decode(), 'default default')
+
+    def test_post_request_reads_primary(self):
+        request = RequestFactory().post('/')
+        request.session = {}
+        self.assertEqual(self.route(request), 'default')
+
+    def test_outside_request_reads_primary(self):
+        self.assertEqual(Post.published.all().db, 'default')
+
+    def test_commenter_session_is_pinned_to_primary(self):
+        request = self.anonymous_get()
+        pin_to_primary(request)
+        self.assertIn(PIN_SESSION_KEY, request.session)
+        self.assertEqual(self.route(request), 'default')
+        # Другие посетители продолжают читать с реплики
+        self.assertEqual(self.route(self.anonymous_get()), 'replica')
+
+
+class ScheduledPublishingTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            title='Будущий пост',
+            slug='future',
+            author=User.objects.create(username='author'),
+            body='Текст',
+            publish=timezone.now() + timedelta(hours=1),
+            status=Post.Status.PUBLISHED,
+        )
+
+    def test_future_post_is_scheduled_not_published(self):
+        self.assertEqual(self.post.status, Post.Status.SCHEDULED)
+        self.assertFalse(Post.published.filter(id=self.post.id).exists())
+        self.assertEqual(publish_due_posts(), [])
+
+    def test_due_post_goes_live_and_purges_cached_list(self):
+        list_url = reverse('blog:post_list')
+        self.assertNotContains(self.client.get(list_url), 'Будущий пост')
+        Post.objects.filter(id=self.post.id).update(publish=timezone.now() - timedelta(minutes=1))
+
+        published = publish_due_posts()
+        self.assertEqual([post.id for post in published], [self.post.id])
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.status, Post.Status.PUBLISHED)
+        self.assertContains(self.client.get(list_url), 'Будущий пост')
+
+    def test_publish_from_command_process_reaches_worker(self):
+        # Общий кеш (как Redis в production): у воркера и команды разные экземпляры кеша
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                              'LOCATION': location}}
+        list_url, feed_url = reverse('blog:post_list'), reverse('blog:post_feed')
+        with override_settings(CACHES=shared):
+            self.assertNotContains(self.client.get(list_url), 'Будущий пост')
+            etag = self.client.get(feed_url)['ETag']
+        Post.objects.filter(id=self.post.id).update(publish=timezone.now() - timedelta(minutes=1))
+
+        with override_settings(CACHES=shared):  # Новый экземпляр - процесс publish_scheduled
+            publish_due_posts()
+
+        with override_settings(CACHES=shared):
+            self.assertContains(self.client.get(list_url), 'Будущий пост')
+        # Лента не зависит от кеша: новый пост виден и воркеру с собственным LocMemCache
+        with override_settings(CACHES=OTHER_PROCESS_CACHE):
+            response = self.client.get(feed_url, headers={'if-none-match': etag})
+        self.assertContains(response, 'Будущий пост')
+
+
+class PostLookupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            title='Пост',
+            slug='post',
+            author=User.objects.create(username='author'),
+            body='Текст',
+            publish=timezone.make_aware(timezone.datetime(2024, 3, 10, 23, 59)),
+            status=Post.Status.PUBLISHED,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cached_id_makes_lookup_a_single_query(self):
+        self.assertEqual(get_published_post(2024, 3, 10, 'post'), self.post)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_published_post(2024, 3, 10, 'post'), self.post)
+
+    def test_day_boundaries_and_invalid_dates(self):
+        for args in [(2024, 3, 11, 'post'), (2024, 3, 9, 'post'), (2024, 2, 30, 'post'),
+                     (9999, 12, 31, 'post'), (10 ** 20, 1, 1, 'post')]:
+            with self.assertRaises(Http404):
+                get_published_post(*args)
+
+    def test_renamed_post_is_not_served_by_old_url(self):
+        get_published_post(2024, 3, 10, 'post')
+        self.post.slug = 'renamed'
+        self.post.save()
+        with self.assertRaises(Http404):
+            get_published_post(2024, 3, 10, 'post')
+        self.assertEqual(get_published_post(2024, 3, 10, 'renamed'), self.post)
+
+
+async def anonymous_user():
+    return AnonymousUser()
+
+
+@override_settings(CACHES=benchmark.NO_CACHE)
+class AsyncViewTests(TestCase):
+    """Async-представления вызываются напрямую: маршруты выбираются по BLOG_ASYNC_VIEWS при импорте"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            title='Асинхронный пост',
+            slug='async-post',
+            author=User.objects.create(username='author'),
+            body='**Текст** поста',
+            status=Post.Status.PUBLISHED,
+        )
+        cls.post.tags.add('django')
+
+    async def call(self, view, url, data=None, params=None, headers=None):
+        factory = AsyncRequestFactory()
+        if data is not None:
+            request = factory.post(url, data)
+        else:
+            request = factory.get(url, params, headers=headers)
+        request.user = AnonymousUser()
+        request.auser = anonymous_user
+        request.session = SessionStore()
+        request.resolver_match = resolve(request.path)
+        return await view(request, *request.resolver_match.args, **request.resolver_match.kwargs)
+
+    async def test_post_list(self):
+        response = await self.call(async_views.post_list, reverse('blog:post_list'))
+        self.assertContains(response, 'Асинхронный пост')
+        response = await self.call(
+            async_views.post_list, reverse('blog:post_list_by_tag', args=['django'])
+        )
+        self.assertContains(response, 'Асинхронный пост')
+
+    async def test_post_detail(self):
+        response = await self.call(async_views.post_detail, self.post.get_absolute_url())
+        self.assertContains(response, '<strong>Текст</strong>')
+
+    async def test_post_search(self):
+        response = await self.call(
+            async_views.post_search, reverse('blog:post_search'), params={'query': 'Асинхронный'}
+        )
+        self.assertEqual(response.status_code, 200)
+
+    async def test_post_comment_updates_counter(self):
+        await self.call(
+            async_views.post_comment,
+            reverse('blog:post_comment', args=[self.post.id]),
+            {'name': 'Гость', 'email': 'guest@example.com', 'body': 'Комментарий'},
+        )
+        post = await Post.objects.aget(id=self.post.id)
+        self.assertEqual(post.active_comments, 1)
+
+    async def test_post_share_queues_mail(self):
+        await self.call(
+            async_views.post_share,
+            reverse('blog:post_share', args=[self.post.id]),
+            {'name': 'Гость', 'email': 'guest@example.com', 'to': 'friend@example.com',
+             'comments': ''},
+        )
+        self.assertEqual(await OutgoingEmail.objects.filter(recipient='friend@example.com').acount(), 1)
+
+    # XML ленты кешируется под состоянием из БД - проверяем с настоящим backend
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+    async def test_feed_conditional_get(self):
+        feed = AsyncLatestPostsFeed()
+        response = await self.call(feed, reverse('blog:post_feed'))
+        self.assertContains(response, 'Асинхронный пост')
+        response = await self.call(
+            feed, reverse('blog:post_feed'), headers={'if-none-match': response['ETag']}
+        )
+        self.assertEqual(response.status_code, 304)
+
+
+class StaticAssetsTests(TestCase):
+    """collectstatic пишет файлы с хешем и .gz, StaticFilesMiddleware отдаёт их по Accept-Encoding"""
+
+    def setUp(self):
+        self.static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.static_root)
+        settings = override_settings(
+            STATIC_ROOT=self.static_root,
+            STORAGES={
+                'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+                'staticfiles': {'BACKEND': 'blog.staticfiles.CompressedManifestStaticFilesStorage'},
+            },
+            BLOG_SERVE_STATIC=True,
+            CACHES=benchmark.NO_CACHE,
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(os.path.join(self.static_root, 'staticfiles.json')) as f:
+            self.css = '/static/' + json.load(f)['paths']['css/blog.css']
+
+    def test_collectstatic_writes_hashed_and_compressed_files(self):
+        self.assertRegex(self.css, r'^/static/css/blog\.[0-9a-f]{12}\.css$')
+        self.assertTrue(os.path.exists(os.path.join(self.static_root, self.css[len('/static/'):] + '.gz')))
+
+    def test_pages_link_hashed_names(self):
+        self.assertContains(self.client.get(reverse('blog:post_list')), self.css)
+
+    def test_hashed_file_is_immutable_and_precompressed(self):
+        response = self.client.get(self.css, headers={'accept-encoding': 'gzip, deflate'})
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        with open(os.path.join(self.static_root, 'css', 'blog.css'), 'rb') as f:
+            self.assertEqual(gzip.decompress(response.content), f.read())
+
+    def test_identity_and_unhashed_name(self):
+        response = self.client.get('/static/css/blog.css', headers={'accept-encoding': 'gzip;q=0'})
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        response = self.client.get('/static/css/blog.css', headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+class WarmupTests(TestCase):
+
+    @override_settings(CACHES=benchmark.NO_CACHE)
+    def test_warm_up_reports_templates_and_first_request(self):
+        with self.assertLogs('blog.warmup', 'INFO') as logs:
+            warm_up()
+            self.client.get(reverse('blog:post_list'))
+        self.assertIn(f'({len(list(template_names()))} templates', logs.output[0])
+        self.assertIn('first request took', logs.output[1])
+
+
+@override_settings(CACHES=benchmark.NO_CACHE)
+class FastPathTests(TestCase):
+    """Анонимные GET публичных страниц без cookie сессии не проходят sessions/auth/messages"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            title='Короткий путь',
+            slug='fast-path',
+            author=cls.author,
+            body='Текст',
+            status=Post.Status.PUBLISHED,
+        )
+
+    def test_anonymous_read_is_lean(self):
+        response = self.client.get(self.post.get_absolute_url())
+        request = response.wsgi_request
+        self.assertTrue(request.blog_lean)
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertIn('Cookie', response['Vary'])
+        # Форма комментария на странице: CSRF-cookie выдаётся как обычно
+        self.assertIn('csrftoken', response.cookies)
+
+    def test_logged_in_reader_takes_full_path(self):
+        self.client.force_login(self.author)
+        request = self.client.get(reverse('blog:post_list')).wsgi_request
+        self.assertFalse(hasattr(request, 'blog_lean'))
+        self.assertTrue(request.user.is_authenticated)
+
+    def test_share_and_comment_take_full_path(self):
+        request = self.client.get(reverse('blog:post_share', args=[self.post.id])).wsgi_request
+        self.assertTrue(hasattr(request, 'session'))
+        response = self.client.post(
+            reverse('blog:post_comment', args=[self.post.id]),
+            {'name': 'Гость', 'email': 'guest@example.com', 'body': 'Комментарий'},
+        )
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 1)
+
+    @override_settings(BLOG_FAST_PATH=False)
+    def test_disabled(self):
+        request = self.client.get(reverse('blog:post_list')).wsgi_request
+        self.assertTrue(hasattr(request, 'session'))
+
+
+# Отдельные экземпляры LocMemCache: так выглядят кеши двух воркеров (или воркера и команды)
+WORKER_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                            'LOCATION': 'worker'}}
+OTHER_PROCESS_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                   'LOCATION': 'other-process'}}
+
+
+@override_settings(CACHES=WORKER_CACHE)
+class FeedValidatorTests(TestCase):
+    """ETag и Last-Modified лент считаются по БД и не зависят от кеша процесса"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            title='Первый пост', slug='first', author=cls.author, body='Текст',
+            status=Post.Status.PUBLISHED,
+        )
+        cls.post.tags.add('django')
+
+    def setUp(self):
+        cache.clear()
+
+    def publish(self, title, slug, **kwargs):
+        return Post.objects.create(
+            title=title, slug=slug, author=self.author, body='Текст',
+            status=Post.Status.PUBLISHED, **kwargs
+        )
+
+    def test_change_from_other_process_is_visible(self):
+        url = reverse('blog:post_feed')
+        etag = self.client.get(url)['ETag']
+        with override_settings(CACHES=OTHER_PROCESS_CACHE):
+            self.publish('Второй пост', 'second')
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Второй пост')
+
+    def test_unpublish_changes_etag(self):
+        url = reverse('blog:post_feed')
+        self.publish('Старый пост', 'old', publish=timezone.now() - timedelta(days=1))
+        etag = self.client.get(url)['ETag']
+        with override_settings(CACHES=OTHER_PROCESS_CACHE):
+            Post.objects.filter(slug='old').update(status=Post.Status.DRAFT)
+        self.assertNotEqual(self.client.get(url)['ETag'], etag)
+
+    def test_workers_agree_on_etag(self):
+        url = reverse('blog:post_feed_by_tag', args=['django'])
+        etag = self.client.get(url)['ETag']
+        with override_settings(CACHES=OTHER_PROCESS_CACHE):
+            response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_feed_does_not_publish_usernames(self):
+        response = self.client.get(reverse('blog:post_feed'))
+        self.assertContains(response, '<category>django</category>')
+        self.assertNotContains(response, self.author.username)
+
+    def test_tag_change_changes_tag_feed(self):
+        older = self.publish('Старый пост', 'old', publish=timezone.now() - timedelta(days=1))
+        url = reverse('blog:post_feed_by_tag', args=['django'])
+        etag = self.client.get(url)['ETag']
+        older.tags.add('django')
+        response = self.client.get(url, headers={'if-none-match': etag})
+        self.assertContains(response, 'Старый пост')
+
+
+@override_settings(BLOG_COMMENT_INGESTION='buffered', BLOG_COMMENT_BUFFER_LIMIT=2,
+                   CACHES=WORKER_CACHE)
+class BufferedCommentTests(TestCase):
+    """Буфер комментариев: приём, переполнение, перенос воркером и его побочные эффекты"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            title='Пост с комментариями',
+            slug='buffered',
+            author=User.objects.create(username='author'),
+            body='Текст',
+            status=Post.Status.PUBLISHED,
+            publish=timezone.now() - timedelta(days=1),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def comment(self, body, post=None):
+        return self.client.post(
+            reverse('blog:post_comment', args=[(post or self.post).id]),
+            {'name': 'Гость', 'email': 'guest@example.com', 'body': body},
+        )
+
+    def test_comment_is_buffered(self):
+        response = self.comment('В буфер')
+        self.assertContains(response, 'скоро появится')
+        self.assertEqual(PendingComment.objects.get().body, 'В буфер')
+        self.assertFalse(Comment.objects.exists())
+
+    def test_full_buffer_falls_back_to_direct_write(self):
+        self.comment('Первый')
+        self.comment('Второй')
+        response = self.comment('Третий')
+        self.assertContains(response, 'добавлен')
+        self.assertEqual(PendingComment.objects.count(), 2)
+        self.assertEqual(Comment.objects.get().body, 'Третий')
+
+    def test_flush_keeps_submission_time_and_updates_counter(self):
+        self.comment('Ждёт воркера')
+        submitted = timezone.now() - timedelta(minutes=5)
+        PendingComment.objects.update(created=submitted)
+
+        self.assertEqual(flush_comments(100), 1)
+        comment = Comment.objects.get()
+        self.assertEqual((comment.body, comment.created, comment.active),
+                         ('Ждёт воркера', submitted, True))
+        self.assertFalse(PendingComment.objects.exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.active_comments, 1)
+
+    def test_flush_drops_comments_for_unpublished_posts(self):
+        draft = Post.objects.create(
+            title='Черновик', slug='draft', author=self.post.author, body='Текст'
+        )
+        PendingComment.objects.create(post_id=draft.id, name='Гость',
+                                      email='guest@example.com', body='Потерян')
+        self.assertEqual(flush_comments(100), 1)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(PendingComment.objects.exists())
+        draft.refresh_from_db()
+        self.assertEqual(draft.active_comments, 0)
+
+    def test_flush_purges_post_page_and_sidebar(self):
+        url = self.post.get_absolute_url()
+        self.client.get(url)  # Страница и боковая панель попадают в кеш
+        self.assertTrue(cache.has_key(make_template_fragment_key(SIDEBAR_FRAGMENT)))
+        self.comment('Новый комментарий')
+        flush_comments(100)
+        self.assertFalse(cache.has_key(make_template_fragment_key(SIDEBAR_FRAGMENT)))
+        self.assertContains(self.client.get(url), 'Новый комментарий')
+
+
+@override_settings(CACHES=benchmark.NO_CACHE)
+class SitemapTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            title='Пост в карте сайта',
+            slug='sitemap-post',
+            author=User.objects.create(username='author'),
+            body='Текст',
+            status=Post.Status.PUBLISHED,
+            publish=timezone.make_aware(timezone.datetime(2024, 3, 15, 12)),
+        )
+
+    def content(self, response):
+        return b''.join(response.streaming_content) if response.streaming else response.content
+
+    def test_index_lists_months(self):
+        response = self.client.get(reverse('blog_sitemap_index'))
+        self.assertIn(b'/sitemap-2024-3.xml', self.content(response))
+
+    def test_section_lists_posts_and_supports_etag(self):
+        url = reverse('blog_sitemap_section', args=[2024, 3])
+        response = self.client.get(url)
+        self.assertIn(self.post.get_absolute_url().encode(), self.content(response))
+        response = self.client.get(url, headers={'if-none-match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_section_is_read_within_request(self):
+        # Строки секции читаются до ответа: в той же реплике и в замерах запроса
+        url = reverse('blog_sitemap_section', args=[2024, 3])
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertFalse(response.streaming)
+        self.assertIn(self.post.get_absolute_url().encode(), response.content)
+        self.assertIn(f'desc="{len(ctx)} queries"', response['Server-Timing'])
+
+    def test_impossible_months_are_404(self):
+        for year, month in [(0, 1), (10000, 1), (9999, 12), (2024, 13), (2024, 0), (10 ** 20, 1)]:
+            with self.subTest(year=year, month=month):
+                response = self.client.get(f'/sitemap-{year}-{month}.xml')
+                self.assertEqual(response.status_code, 404)
+
+
+@override_settings(CACHES=benchmark.NO_CACHE)
+class RelatedPostsTests(TestCase):
+    """Подборки похожих постов: расчёт, инкрементальное обновление и полная пересборка"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        now = timezone.now()
+        cls.post = cls.publish('Главный', 'main', ['a', 'b', 'c'], now)
+        cls.two_tags = cls.publish('Два тега', 'two', ['a', 'b'], now - timedelta(days=3))
+        cls.one_tag_new = cls.publish('Один тег, новее', 'one-new', ['c'], now - timedelta(days=1))
+        cls.one_tag_old = cls.publish('Один тег, старше', 'one-old', ['a'], now - timedelta(days=2))
+        cls.unrelated = cls.publish('Чужой', 'unrelated', ['z'], now)
+
+    @classmethod
+    def publish(cls, title, slug, tags, publish, status=Post.Status.PUBLISHED):
+        post = Post.objects.create(
+            title=title, slug=slug, author=cls.author, body='Текст', status=status,
+            publish=publish,
+        )
+        post.tags.add(*tags)
+        return post
+
+    def stored(self, post):
+        return list(RelatedPost.objects.filter(post=post).values_list('related_id', flat=True))
+
+    def test_compute_related_orders_by_shared_tags_then_date(self):
+        rows = compute_related(self.post)
+        self.assertEqual(
+            [(row.related_id, row.same_tags) for row in rows],
+            [(self.two_tags.id, 2), (self.one_tag_new.id, 1), (self.one_tag_old.id, 1)],
+        )
+        self.assertEqual(rows[0].related_publish, self.two_tags.publish)
+
+    def test_compute_related_skips_drafts(self):
+        draft = self.publish('Черновик', 'draft', ['a', 'b', 'c'], timezone.now(),
+                             status=Post.Status.DRAFT)
+        self.assertEqual(compute_related(draft), [])
+        self.assertNotIn(draft.id, [row.related_id for row in compute_related(self.post)])
+
+    def test_compute_related_is_limited(self):
+        for i in range(RELATED_POSTS_LIMIT):
+            self.publish(f'Ещё {i}', f'more-{i}', ['a', 'b', 'c'], timezone.now())
+        rows = compute_related(self.post)
+        self.assertEqual(len(rows), RELATED_POSTS_LIMIT)
+        self.assertTrue(all(row.same_tags == 3 for row in rows))
+
+    def test_new_post_enters_neighbours_tops(self):
+        self.assertEqual(self.stored(self.unrelated), [])
+        newcomer = self.publish('Новичок', 'newcomer', ['z', 'a'], timezone.now())
+        self.assertEqual(self.stored(self.unrelated), [newcomer.id])
+        self.assertIn(newcomer.id, self.stored(self.post))
+        self.assertIn(self.unrelated.id, self.stored(newcomer))
+
+    def test_unpublishing_leaves_neighbours_tops(self):
+        self.assertIn(self.two_tags.id, self.stored(self.post))
+        self.two_tags.status = Post.Status.DRAFT
+        self.two_tags.save()
+        self.assertNotIn(self.two_tags.id, self.stored(self.post))
+        self.assertEqual(self.stored(self.two_tags), [])
+
+    def test_refresh_incremental_matches_full_computation(self):
+        self.one_tag_old.tags.add('b', 'c')
+        for post in Post.published.all():
+            with self.subTest(post=post.slug):
+                expected = [row.related_id for row in compute_related(post)]
+                self.assertEqual(self.stored(post), expected)
+
+    def test_edit_without_status_or_date_change_keeps_tops(self):
+        post = Post.objects.get(pk=self.post.pk)
+        post.title = 'Новый заголовок'
+        with CaptureQueriesContext(connection) as ctx:
+            post.save()
+        self.assertFalse(any('blog_relatedpost' in query['sql'] for query in ctx.captured_queries))
+
+    def test_rebuild_replaces_stale_rows(self):
+        draft = self.publish('Черновик', 'draft', ['a'], timezone.now(), status=Post.Status.DRAFT)
+        RelatedPost.objects.create(post=draft, related=self.post, same_tags=1,
+                                   related_publish=self.post.publish)
+        RelatedPost.objects.filter(post=self.post).delete()
+        call_command('rebuild_related_posts', batch_size=2, stdout=io.StringIO())
+        self.assertEqual(self.stored(draft), [])
+        for post in Post.published.all():
+            with self.subTest(post=post.slug):
+                expected = [row.related_id for row in compute_related(post)]
+                self.assertEqual(self.stored(post), expected)
+
+
+@override_settings(CACHES=WORKER_CACHE, BLOG_SEARCH_MAX_RESULTS=3, BLOG_SEARCH_PER_PAGE=2)
+class SearchTests(TestCase):
+    """Поиск: лимит выборки, кеш нормализованного запроса, таймаут и пагинация по id"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        now = timezone.now()
+        cls.posts = [
+            Post.objects.create(
+                title=f'Django заметка {i}', slug=f'django-{i}', author=cls.author,
+                body='Текст', status=Post.Status.PUBLISHED, publish=now - timedelta(days=i),
+            )
+            for i in range(5)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, query, **params):
+        return self.client.get(reverse('blog:post_search'), {'query': query, **params})
+
+    def test_results_are_capped(self):
+        ids, timed_out = search_post_ids('django')
+        self.assertFalse(timed_out)
+        self.assertEqual(ids, [post.id for post in self.posts[:3]])
+        self.assertContains(self.search('django'), 'Найдено результатов: не менее 3.')
+
+    def test_total_below_cap_is_exact(self):
+        with override_settings(BLOG_SEARCH_MAX_RESULTS=10):
+            response = self.search('django')
+        self.assertContains(response, 'Найдено результатов: 5.')
+
+    def test_normalized_query_is_cached(self):
+        ids, _ = search_post_ids('  Django   ЗАМЕТКА ')
+        with self.assertNumQueries(0):
+            self.assertEqual(search_post_ids('django заметка'), (ids, False))
+
+    def test_timeout_returns_empty_uncached_result(self):
+        with patch('blog.search.ranked_ids', side_effect=OperationalError('canceling statement')):
+            self.assertEqual(search_post_ids('django'), ([], True))
+            response = self.search('django')
+        self.assertContains(response, 'Поиск занял слишком много времени')
+        self.assertEqual(search_post_ids('django')[0], [post.id for post in self.posts[:3]])
+
+    def test_pages_load_only_their_posts(self):
+        response = self.search('django', page=2)
+        self.assertEqual(response.context['results'], [self.posts[2]])
+        self.assertContains(response, 'Страница 2 из 2.')
+        # Id уже в кеше: в БД идёт только загрузка постов страницы
+        with self.assertNumQueries(1):
+            response = self.search('django', page=1)
+        self.assertEqual(response.context['results'], self.posts[:2])
+
+    async def test_async_view_reports_cap(self):
+        request = AsyncRequestFactory().get(reverse('blog:post_search'), {'query': 'django'})
+        request.user = AnonymousUser()
+        response = await async_views.post_search(request)
+        self.assertContains(response, 'Найдено результатов: не менее 3.')
+
+    def test_russian_stemming_uses_stored_vector(self):
+        post = Post.objects.create(
+            title='Индексы', slug='indexes', author=self.author,
+            body='Пишем о больших базах данных', status=Post.Status.PUBLISHED,
+        )
+        self.assertEqual(search_post_ids('база')[0], [post.id])
+        self.assertEqual(search_post_ids('большая')[0], [post.id])
+
+    def test_title_trigram_fallback_for_typos(self):
+        post = Post.objects.create(
+            title='Кеширование запросов', slug='caching', author=self.author,
+            body='Текст', status=Post.Status.PUBLISHED,
+        )
+        self.assertEqual(search_post_ids('кеширавание запросав')[0], [post.id])
+
+    def test_title_trigram_fallback_uses_low_threshold(self):
+        post = Post.objects.create(
+            title='Кеширование запросов к базе данных PostgreSQL', slug='caching',
+            author=self.author, body='Текст', status=Post.Status.PUBLISHED,
+        )
+        similarity = Post.objects.annotate(
+            similarity=TrigramSimilarity('title', 'кешировние')
+        ).get(pk=post.pk).similarity
+        # Ниже порога pg_trgm по умолчанию (0.3), но выше BLOG_SEARCH_TRIGRAM_THRESHOLD
+        self.assertTrue(0.1 < similarity < 0.3, similarity)
+        self.assertEqual(search_post_ids('кешировние')[0], [post.id])
+        cache.clear()
+        with override_settings(BLOG_SEARCH_TRIGRAM_THRESHOLD=0.3):
+            self.assertEqual(search_post_ids('кешировние')[0], [])
+
+
+@override_settings(CACHES=benchmark.NO_CACHE)
+class CommentCounterTests(TestCase):
+    """Post.active_comments следует за созданием, (де)активацией, переносом и удалением"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create(username='author')
+        cls.post, cls.other = [
+            Post.objects.create(title=title, slug=slug, author=author, body='Текст',
+                                status=Post.Status.PUBLISHED)
+            for title, slug in [('Первый', 'first'), ('Второй', 'second')]
+        ]
+
+    def setUp(self):
+        self.comment = Comment.objects.create(
+            post=self.post, name='Гость', email='guest@example.com', body='Комментарий'
+        )
+
+    def assertCounts(self, post_count, other_count):
+        self.assertEqual(
+            [Post.objects.get(pk=pk).active_comments for pk in (self.post.pk, self.other.pk)],
+            [post_count, other_count],
+        )
+
+    def test_create_counts_active_comment(self):
+        Comment.objects.create(post=self.post, name='Гость', email='guest@example.com',
+                               body='Скрытый', active=False)
+        self.assertCounts(1, 0)
+
+    def test_deactivate_and_reactivate(self):
+        self.comment.active = False
+        self.comment.save()
+        self.assertCounts(0, 0)
+        self.comment.save()  # Повторное сохранение ничего не меняет
+        self.assertCounts(0, 0)
+        comment = Comment.objects.get(pk=self.comment.pk)
+        comment.active = True
+        comment.save()
+        self.assertCounts(1, 0)
+
+    def test_move_to_other_post(self):
+        self.comment.post = self.other
+        self.comment.save()
+        self.assertCounts(0, 1)
+        self.comment.active = False
+        self.comment.post = self.post
+        self.comment.save()
+        self.assertCounts(0, 0)
+
+    def test_delete(self):
+        Comment.objects.get(pk=self.comment.pk).delete()
+        self.assertCounts(0, 0)
+        hidden = Comment.objects.create(post=self.post, name='Гость', email='guest@example.com',
+                                        body='Скрытый', active=False)
+        hidden.delete()
+        self.assertCounts(0, 0)
+
+    def test_loading_deferred_fields_does_not_query(self):
+        with self.assertNumQueries(1):
+            comments = list(Comment.objects.only('id', 'post', 'body'))
+        comment = comments[0]
+        comment.body = 'Исправлено'
+        with self.assertNumQueries(2):  # UPDATE и адрес страницы поста для сброса
+            comment.save()
+        self.assertCounts(1, 0)
+
+    def test_deferred_comment_changes_are_counted(self):
+        comment = Comment.objects.only('id').get(pk=self.comment.pk)
+        comment.active = False
+        comment.save(update_fields=['active'])
+        self.assertCounts(0, 0)
+        comment = Comment.objects.only('id', 'active').get(pk=self.comment.pk)
+        comment.post = self.other
+        comment.active = True
+        comment.save(update_fields=['active', 'post'])
+        self.assertCounts(0, 1)
+        Comment.objects.only('id').get(pk=self.comment.pk).delete()
+        self.assertCounts(0, 0)
+
+
+@override_settings(CACHES=benchmark.NO_CACHE, BLOG_COMMENTS_PER_PAGE=2)
+class PostCommentsFragmentTests(TestCase):
+    """Фрагмент post_comments: страницы активных комментариев по курсору"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            title='Пост', slug='post', author=cls.author, body='Текст',
+            status=Post.Status.PUBLISHED,
+        )
+        for i in range(5):
+            Comment.objects.create(post=cls.post, name=f'Гость {i}', email='guest@example.com',
+                                   body=f'Комментарий {i}')
+        Comment.objects.create(post=cls.post, name='Скрытый', email='guest@example.com',
+                               body='Скрытый', active=False)
+
+    def fragment(self, post_id=None, **params):
+        url = reverse('blog:post_comments', args=[post_id or self.post.id])
+        return self.client.get(url, params)
+
+    def names(self, response):
+        return [comment.name for comment in response.context['comments']]
+
+    def next_link(self, response):
+        match = re.search(r'class="more-comments" href="([^"]+)"', response.content.decode())
+        return match and match.group(1).replace('&amp;', '&')
+
+    def test_first_page(self):
+        response = self.fragment()
+        self.assertEqual(self.names(response), ['Гость 0', 'Гость 1'])
+        self.assertContains(response, 'Комментарий 1 от Гость 0')
+
+    def test_next_cursor_walks_all_active_comments(self):
+        response = self.fragment()
+        names = self.names(response)
+        while (link := self.next_link(response)):
+            response = self.client.get(link)
+            names += self.names(response)
+        self.assertEqual(names, [f'Гость {i}' for i in range(5)])
+        # Нумерация продолжается с учётом уже показанных комментариев
+        self.assertContains(response, 'Комментарий 5 от Гость 4')
+        self.assertNotContains(response, 'Комментариев пока нет')
+
+    def test_invalid_cursor_returns_first_page(self):
+        response = self.fragment(cursor='not-a-cursor', start='x')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.names(response), ['Гость 0', 'Гость 1'])
+
+    def test_unpublished_post_is_404(self):
+        draft = Post.objects.create(title='Черновик', slug='draft', author=self.author,
+                                    body='Текст', status=Post.Status.DRAFT)
+        self.assertEqual(self.fragment(draft.id).status_code, 404)
+        self.assertEqual(self.fragment(10 ** 6).status_code, 404)
+
+
+@override_settings(CACHES=WORKER_CACHE, BLOG_PAGE_CACHE_TIMEOUT=0)
+class SidebarCacheTests(TestCase):
+    """Закешированная боковая панель сбрасывается при изменении постов и комментариев"""
+
+    key = make_template_fragment_key(SIDEBAR_FRAGMENT)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(
+            title='Первый пост', slug='first', author=cls.author, body='Текст',
+            status=Post.Status.PUBLISHED,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def render_sidebar(self):
+        response = self.client.get(reverse('blog:post_list'))
+        self.assertIsNotNone(cache.get(self.key))
+        return response
+
+    def assertSidebarCleared(self, change):
+        self.render_sidebar()
+        change()
+        self.assertIsNone(cache.get(self.key))
+
+    def test_post_save_and_delete(self):
+        post = Post(title='Второй пост', slug='second', author=self.author, body='Текст',
+                    status=Post.Status.PUBLISHED)
+        self.assertSidebarCleared(post.save)
+        self.assertContains(self.render_sidebar(), 'Я написал 2 публикаций.')
+        self.assertSidebarCleared(post.delete)
+        self.assertContains(self.render_sidebar(), 'Я написал 1 публикаций.')
+
+    def test_comment_save_and_delete(self):
+        comment = Comment(post=self.post, name='Гость', email='guest@example.com', body='Текст')
+        self.assertSidebarCleared(comment.save)
+        comment.active = False
+        self.assertSidebarCleared(comment.save)
+        self.assertSidebarCleared(comment.delete)
+
+
+@override_settings(CACHES=benchmark.NO_CACHE)
+class PostRenderingTests(TestCase):
+    """Markdown поста рендерится при сохранении только при изменении тела"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create(username='author')
+
+    def create(self, body, slug='post'):
+        return Post.objects.create(title='Пост', slug=slug, author=self.author, body=body,
+                                   status=Post.Status.PUBLISHED)
+
+    def test_post_is_rendered_on_save(self):
+        post = self.create('**Жирный** текст')
+        stored = Post.objects.get(pk=post.pk)
+        self.assertEqual(stored.body_html, '<p><strong>Жирный</strong> текст</p>')
+        self.assertEqual(stored.excerpt_html, stored.body_html)
+        self.assertEqual(stored.body_hash, content_hash('**Жирный** текст'))
+
+    def test_unchanged_body_is_not_rerendered(self):
+        post = self.create('Текст')
+        post.title = 'Новый заголовок'
+        with patch('blog.rendering.render_markdown', wraps=render_markdown) as render:
+            post.save()
+            render.assert_not_called()
+            post.body = 'Новый текст'
+            post.save()
+            render.assert_called_once_with('Новый текст')
+
+    def test_excerpt_is_truncated(self):
+        words = [f'слово{i}' for i in range(EXCERPT_WORDS * 2)]
+        post = self.create(' '.join(words))
+        self.assertIn(words[EXCERPT_WORDS - 1], post.excerpt_html)
+        self.assertNotIn(words[EXCERPT_WORDS], post.excerpt_html)
+        self.assertIn(words[-1], post.body_html)
+
+    def test_render_posts_backfills_empty_html(self):
+        posts = [self.create(f'*Пост {i}*', slug=f'post-{i}') for i in range(3)]
+        Post.objects.update(body_html='', excerpt_html='', body_hash='')
+        out = io.StringIO()
+        call_command('render_posts', batch_size=2, stdout=out)
+        self.assertIn('Перерендерено постов: 3', out.getvalue())
+        for post in posts:
+            self.assertEqual(Post.objects.get(pk=post.pk).body_html, post.body_html)
+        # Повторный запуск ничего не перерендеривает
+        self.assertEqual(render_posts(Post.objects.all()), 0)
+
+    def test_migration_renders_existing_posts(self):
+        post = self.create('*Текст*')
+        Post.objects.update(body_html='', excerpt_html='', body_hash='')
+        migration = importlib.import_module('blog.migrations.0010_post_body_html')
+        with connection.schema_editor() as schema_editor:
+            migration.render_existing_posts(django_apps, schema_editor)
+        self.assertEqual(Post.objects.get(pk=post.pk).body_html, '<p><em>Текст</em></p>')
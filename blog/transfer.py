@@ -0,0 +1,181 @@
+# Потоковый экспорт/импорт данных блога в формате JSON Lines
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+from taggit.models import Tag, TaggedItem
+
+from .caching import invalidate_sidebar
+from .counters import recount_active_comments
+from .models import Comment, Post
+from .rendering import render_post
+
+User = get_user_model()
+
+# Порядок типов в файле: строки ссылаются только на уже встреченные объекты.
+# Хеши паролей и email авторов не выгружаются: файл уходит в менее защищённые окружения
+AUTHOR_FIELDS = ['id', 'username', 'first_name', 'last_name', 'date_joined']
+TAG_FIELDS = ['id', 'name', 'slug']
+POST_FIELDS = ['id', 'title', 'slug', 'author_id', 'body', 'publish', 'created', 'updated', 'status']
+COMMENT_FIELDS = ['id', 'post_id', 'name', 'email', 'body', 'created', 'updated', 'active']
+DATETIME_FIELDS = {'date_joined', 'publish', 'created', 'updated'}
+
+
+def iter_by_id(queryset, batch_size):
+    """Обходит queryset пачками по возрастанию id (keyset, без OFFSET)"""
+    last_id = 0
+    while True:
+        batch = list(queryset.filter(id__gt=last_id).order_by('id')[:batch_size])
+        if not batch:
+            return
+        yield batch
+        last_id = batch[-1]['id']
+
+
+def export_lines(batch_size=1000):
+    """Генерирует строки JSONL: авторы, теги, посты (со списком id тегов), комментарии"""
+    authors = User.objects.filter(blog_posts__isnull=False).distinct().values(*AUTHOR_FIELDS)
+    sources = [
+        ('author', authors),
+        ('tag', Tag.objects.values(*TAG_FIELDS)),
+        ('post', Post.objects.values(*POST_FIELDS)),
+        ('comment', Comment.objects.values(*COMMENT_FIELDS)),
+    ]
+    post_type = ContentType.objects.get_for_model(Post)
+    for kind, queryset in sources:
+        for batch in iter_by_id(queryset, batch_size):
+            tags = {}
+            if kind == 'post':
+                # Теги всей пачки постов - одним запросом
+                items = TaggedItem.objects.filter(
+                    content_type=post_type,
+                    object_id__in=[row['id'] for row in batch]
+                ).values_list('object_id', 'tag_id')
+                for object_id, tag_id in items:
+                    tags.setdefault(object_id, []).append(tag_id)
+            for row in batch:
+                if kind == 'post':
+                    row['tags'] = tags.get(row['id'], [])
+                row['type'] = kind
+                yield json.dumps(row, ensure_ascii=False, default=str) + '\n'
+
+
+class Importer:
+    """
+    Читает JSONL построчно и вставляет объекты пачками через bulk_create.
+    В памяти хранится не больше одной пачки на тип, поэтому размер файла не важен.
+    """
+
+    def __init__(self, batch_size=1000, ignore_conflicts=False):
+        self.batch_size = batch_size
+        self.ignore_conflicts = ignore_conflicts
+        self.buffers = {'author': [], 'tag': [], 'post': [], 'comment': []}
+        self.counts = dict.fromkeys(self.buffers, 0)
+        self.post_type = ContentType.objects.get_for_model(Post)
+        self.started = time.monotonic()
+
+    def add(self, line):
+        data = json.loads(line)
+        kind = data.pop('type')
+        for name in DATETIME_FIELDS & data.keys():
+            data[name] = parse_datetime(data[name])
+        self.add_row(kind, data)
+
+    def add_row(self, kind, data):
+        """Добавляет уже разобранный объект (поля как в export_lines, даты - datetime)"""
+        # Строки ссылаются на объекты предыдущих типов - сначала сбрасываем их буферы
+        for previous in self.buffers:
+            if previous == kind:
+                break
+            self.flush(previous)
+        self.buffers[kind].append(data)
+        if len(self.buffers[kind]) >= self.batch_size:
+            self.flush(kind)
+
+    def flush(self, kind):
+        rows = self.buffers[kind]
+        if not rows:
+            return
+        with transaction.atomic():
+            getattr(self, f'insert_{kind}s')(rows)
+        self.counts[kind] += len(rows)
+        self.buffers[kind] = []
+
+    def bulk_create(self, model, objects, restore=()):
+        """
+        Вставляет объекты и возвращает действительно вставленные. С ignore_conflicts
+        строки с уже существующим id пропускаются - их даты и связи не трогаем.
+        """
+        if self.ignore_conflicts:
+            # ON CONFLICT DO NOTHING не сообщает, какие строки пропущены: id берутся из
+            # файла, поэтому существующие определяем до вставки (в той же транзакции)
+            existing = set(
+                model.objects.filter(pk__in=[obj.pk for obj in objects])
+                .values_list('pk', flat=True)
+            )
+        else:
+            existing = set()
+        # bulk_create проставляет auto_now/auto_now_add текущим временем прямо в объектах -
+        # запоминаем исходные даты и возвращаем их через bulk_update (он их не трогает)
+        original = [[getattr(obj, name) for name in restore] for obj in objects]
+        model.objects.bulk_create(objects, ignore_conflicts=self.ignore_conflicts)
+        inserted = []
+        for obj, values in zip(objects, original):
+            if obj.pk in existing:
+                continue
+            for name, value in zip(restore, values):
+                setattr(obj, name, value)
+            inserted.append(obj)
+        if restore and inserted:
+            model.objects.bulk_update(inserted, list(restore))
+        return inserted
+
+    def insert_authors(self, rows):
+        users = [User(**row) for row in rows]
+        for user in users:
+            user.set_unusable_password()  # Войти под импортированным автором нельзя
+        self.bulk_create(User, users)
+
+    def insert_tags(self, rows):
+        self.bulk_create(Tag, [Tag(**row) for row in rows])
+
+    def insert_posts(self, rows):
+        posts, tag_ids = [], {}
+        for row in rows:
+            tag_ids[row['id']] = row.pop('tags', [])
+            post = Post(**row)
+            render_post(post)  # HTML Markdown готов сразу после импорта
+            post.apply_schedule()  # Посты с будущей датой ждут publish_scheduled
+            posts.append(post)
+        inserted = self.bulk_create(Post, posts, restore=('created', 'updated'))
+        # Through-строки taggit - одной вставкой на пачку, только для новых постов
+        TaggedItem.objects.bulk_create(
+            [
+                TaggedItem(content_type=self.post_type, object_id=post.id, tag_id=tag_id)
+                for post in inserted
+                for tag_id in tag_ids[post.id]
+            ],
+            ignore_conflicts=self.ignore_conflicts
+        )
+
+    def insert_comments(self, rows):
+        self.bulk_create(Comment, [Comment(**row) for row in rows], restore=('created', 'updated'))
+
+    def finish(self):
+        """Сбрасывает остатки буферов, чинит последовательности id и производные данные"""
+        for kind in self.buffers:
+            self.flush(kind)
+        models = [User, Tag, TaggedItem, Post, Comment]
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(no_style(), models):
+                cursor.execute(sql)
+        recount_active_comments()  # Счётчики комментариев не ведутся при bulk_create
+        invalidate_sidebar()
+
+    def rate(self):
+        elapsed = max(time.monotonic() - self.started, 1e-6)
+        return sum(self.counts.values()) / elapsed
@@ -1,12 +1,18 @@
 # Импорт функции path из модуля django.urls - основы для определения маршрутов URL
 from django.urls import path
 
+from django.conf import settings
+
 # Импорт модуля views из текущего пакета (директории) - содержит обработчики запросов
-from . import views
+from . import async_views, views
 
-from .feeds import LatestPostsFeed
+from .feeds import AsyncLatestPostsFeed, LatestPostsFeed
 # Импорт класса LatestPostsFeed из модуля feeds - для RSS-ленты последних постов
 
+# Под ASGI (BLOG_ASYNC_VIEWS=True) публичные страницы обслуживают async-версии представлений
+public_views = async_views if settings.BLOG_ASYNC_VIEWS else views
+feed_class = AsyncLatestPostsFeed if settings.BLOG_ASYNC_VIEWS else LatestPostsFeed
+
 # Определение пространства имен приложения 'blog' для уникальной идентификации URL
 # Позволяет различать URL разных приложений с одинаковыми именами маршрутов
 app_name = 'blog'
@@ -15,7 +21,7 @@ app_name = 'blog'
 # Список URL-шаблонов (маршрутизация URL → представления)
 urlpatterns = [
     # Альтернативный маршрут для списка постов:
-    path('', views.post_list, name='post_list'),
+    path('', public_views.post_list, name='post_list'),
     # Закомментированный маршрут для списка постов
     #path('', views.PostListView.as_view(), name='post_list'), # Маршрут для списка постов
     # Использует класс PostListView для обработки запросов
@@ -23,7 +29,7 @@ urlpatterns = [
     # name='post_list' позволяет ссылаться на этот URL в шаблонах
     
     path(
-        'tag/<slug:tag_slug>/', views.post_list, name='post_list_by_tag'
+        'tag/<slug:tag_slug>/', public_views.post_list, name='post_list_by_tag'
     ),
 
     # Маршрут для отображения списка постов
@@ -39,7 +45,7 @@ urlpatterns = [
     # Пример URL: /blog/2023/10/25/my-awesome-post/
     path(
         '<int:year>/<int:month>/<int:day>/<slug:post>/',
-        views.post_detail,
+        public_views.post_detail,
         name='post_detail'
     ),
 
@@ -48,7 +54,7 @@ urlpatterns = [
     # Пример URL: /blog/42/share/
     path(
         '<int:post_id>/share/',  # Параметр post_id - ID поста
-        views.post_share,        # Обработчик - функция post_share из views.py
+        public_views.post_share,  # Обработчик - функция post_share из views.py
         name='post_share'       # Имя маршрута для использования в шаблонах
     ),
 
@@ -57,19 +63,34 @@ urlpatterns = [
     # Пример URL: /blog/post/42/comment/
     path(
         'post/<int:post_id>/comment/',  # Параметр post_id - ID поста
-        views.post_comment,             # Обработчик - функция post_comment из views.py
+        public_views.post_comment,      # Обработчик - функция post_comment из views.py
         name='post_comment'             # Имя маршрута для использования в шаблонах
     ),
 
+    # Фрагмент со следующей страницей комментариев к посту:
+    # Пример URL: /blog/post/42/comments/?cursor=...&start=20
+    path(
+        'post/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
+
     # Маршрут для отображения RSS-ленты последних постов:
     # Пример URL: /blog/feed/
     path(
         'feed/', # URL для доступа к RSS-ленте
-        LatestPostsFeed(),  # Обработчик - экземпляр класса LatestPostsFeed
+        feed_class(),  # Обработчик - экземпляр класса LatestPostsFeed
         name='post_feed'    # Имя маршрута для использования в шаблонах
     ),
+    # Лента публикаций по тегу
+    # Пример URL: /blog/feed/tag/django/
+    path(
+        'feed/tag/<slug:tag_slug>/',
+        feed_class(),
+        name='post_feed_by_tag'
+    ),
 
-    path('search/', views.post_search, name='post_search'),  # Поиск постов
+    path('search/', public_views.post_search, name='post_search'),  # Поиск постов
     # URL для поиска постов
     # Пример URL: /blog/search/?q=django
     # Обработчик - функция post_search из views.py
@@ -1,5 +1,4 @@
 # Импорт необходимых модулей Django
-from django.core.mail import send_mail  # Функция отправки email
 from django.core.paginator import (
     EmptyPage,       # Исключение для пустой страницы
     PageNotAnInteger, # Исключение для нечисловой страницы
@@ -9,29 +8,57 @@ from django.shortcuts import (
     get_object_or_404,  # Получение объекта или 404
     render              # Рендеринг шаблонов
 )
+from django.conf import settings  # Настройки проекта (режим пагинации и т.д.)
 from django.views.decorators.http import require_POST  # Декоратор для POST-запросов
 from django.views.generic import ListView  # Класс для списковых представлений
-from django.contrib.postgres.search import SearchVector  # Импорт векторов поиска
 from .forms import CommentForm, EmailPostForm, SearchForm  # Импорт форм
 from .models import Post  # Импорт модели Post из текущего приложения
+from .ingest import buffer_comment, buffering_enabled  # Буферизация комментариев
+from .lookup import get_published_post  # Пост по дате и slug (с кешем id)
+from .outbox import enqueue_mail  # Очередь исходящих писем
+from .page_cache import cache_page_for_anonymous  # Кеш страниц для анонимных читателей
+from .pagination import CursorPaginator  # Курсорная пагинация по (publish, id)
+from .related import RELATED_POSTS_LIMIT  # Размер подборки похожих постов
+from .routers import pin_to_primary  # Чтение своих записей с основной БД
 from taggit.models import Tag  # Импорт модели Tag из приложения taggit
-from django.db.models import Count  # Импорт функции Count для подсчета тегов
-from django.contrib.postgres.search import (
- SearchVector,
- SearchQuery,
- SearchRank
-)
-from django.contrib.postgres.search import TrigramSimilarity
+from .search import search_post_ids  # Ранжированные id результатов поиска (с кешем)
 
+@cache_page_for_anonymous
 def post_list(request, tag_slug=None):
     """Функциональное представление списка опубликованных постов с пагинацией"""
     # Получаем все опубликованные посты через кастомный менеджер
-    post_list = Post.published.all()
+    # Авторы подгружаются JOIN'ом, теги - одним запросом на всю страницу
+    post_list = Post.published.select_related('author').prefetch_related('tags')
     tag = None
     if tag_slug :
         tag = get_object_or_404(Tag, slug=tag_slug)
         post_list = post_list.filter(tags__in=[tag])
 
+    if settings.BLOG_PAGINATION_MODE == 'cursor':
+        # Курсорная пагинация: без COUNT(*) и OFFSET, токен в GET-параметре 'cursor'
+        paginator = CursorPaginator(post_list, 3)
+        posts = paginator.get_page(request.GET.get('cursor'))
+        return render(
+            request,
+            'blog/post/list.html',
+            {
+                'posts': posts,
+                'tag': tag,
+            }
+        )
+
+    # Рендерим шаблон с передачей постов в контекст
+    return render(
+        request,
+        'blog/post/list.html',
+        {
+            'posts': numbered_page(request, post_list),
+            'tag': tag,
+        }
+    )
+
+def numbered_page(request, post_list):
+    """Классическая постраничная навигация (режим BLOG_PAGINATION_MODE = 'page')"""
     # Настройка пагинации - 3 поста на страницу
     paginator = Paginator(post_list, 3)
     
@@ -40,53 +67,33 @@ def post_list(request, tag_slug=None):
     
     try:
         # Пытаемся получить запрошенную страницу
-        posts = paginator.get_page(page_number)
+        return paginator.get_page(page_number)
     except PageNotAnInteger:
         # Если page не число - показываем первую страницу
-        posts = paginator.get_page(1)
+        return paginator.get_page(1)
     except EmptyPage:
         # Если страница вне диапазона - показываем последнюю
-        posts = paginator.get_page(paginator.num_pages)
-    
-    # Рендерим шаблон с передачей постов в контекст
-    return render(
-        request,
-        'blog/post/list.html',
-        {
-            'posts': posts,
-            'tag': tag,
-        }
-    )
+        return paginator.get_page(paginator.num_pages)
 
+@cache_page_for_anonymous
 def post_detail(request, year, month, day, post):
     """Детальное представление поста с проверкой даты и статуса"""
-    # Получаем пост или 404, проверяя:
-    # - статус (только опубликованные)
-    # - slug поста
-    # - точное совпадение даты публикации
-    post = get_object_or_404(
-        Post,
-        status=Post.Status.PUBLISHED,
-        slug=post,
-        publish__year=year,
-        publish__month=month,
-        publish__day=day
-    )
+    # Получаем опубликованный пост или 404 по slug и дню публикации
+    # (диапазон по publish + кеш id поста, см. blog.lookup)
+    post = get_published_post(year, month, day, post)
     
-    # Получаем все комментарии к посту
-    comments = post.comments.filter(active=True)  # Только активные комментарии Мы добавили QuerySet для извлечения всех активных комментариев к посту следующим образом.
+    # Получаем первую страницу активных комментариев к посту,
+    # остальные подгружаются по требованию через post_comments
+    comments = comments_paginator(post).get_page()
     # Инициализируем форму для комментариев
     form = CommentForm()
 
     # Получаем список похожих постов по тегам
-
-    post_tags_ids = post.tags.values_list('id', flat=True) # Получаем ID тегов поста
-    similar_posts = Post.published.filter(
-        tags__in=post_tags_ids # Фильтруем посты по тегам
-    ).exclude(id=post.id) # Исключаем текущий пост
-    similar_posts = similar_posts.annotate(
-        same_tags=Count('tags') # Подсчитываем количество тегов
-    ).order_by('-same_tags', '-publish')[:4] # Сортируем по количеству тегов и дате публикации
+    # Подборка предвычислена (blog.related) - читаем топ одним запросом по индексу
+    similar_posts = [
+        link.related
+        for link in post.related_links.select_related('related')[:RELATED_POSTS_LIMIT]
+    ]
 
     # Рендерим шаблон детальной страницы
     return render(
@@ -101,12 +108,42 @@ def post_detail(request, year, month, day, post):
         # Форма для отправки комментариев пользователем
     )
 
+def comments_paginator(post):
+    """Курсорная пагинация активных комментариев поста по (created, id)"""
+    return CursorPaginator(
+        post.comments.filter(active=True),
+        settings.BLOG_COMMENTS_PER_PAGE,
+        field='created',
+        descending=False
+    )
+
+def post_comments(request, post_id):
+    """HTML-фрагмент со следующей страницей комментариев (подгружается со страницы поста)"""
+    post = get_object_or_404(
+        Post.published.only('id'),
+        id=post_id
+    )
+    comments = comments_paginator(post).get_page(request.GET.get('cursor'))
+    try:
+        start = max(int(request.GET.get('start', 0)), 0)  # Сколько комментариев уже показано
+    except ValueError:
+        start = 0
+    return render(
+        request,
+        'blog/post/includes/comments.html',
+        {
+            'post': post,
+            'comments': comments,
+            'start': start
+        }
+    )
+
 class PostListView(ListView):
     """
     Альтернативное класс-базированное представление списка постов.
     Наследует функциональность Django's ListView.
     """
-    queryset = Post.published.all()  # Queryset всех опубликованных постов
+    queryset = Post.published.select_related('author').prefetch_related('tags')  # Queryset всех опубликованных постов
     context_object_name = 'posts'    # Имя переменной в контексте шаблона
     paginate_by = 3                 # Количество постов на страницу
     template_name = 'blog/post/list.html'  # Путь к шаблону
@@ -127,27 +164,9 @@ def post_share(request, post_id):
         # Если POST-запрос - обрабатываем форму
         form = EmailPostForm(request.POST)
         if form.is_valid():
-            # Если форма валидна - получаем очищенные данные
-            cd = form.cleaned_data
-            
-            # Формируем абсолютный URL поста
-            post_url = request.build_absolute_uri(
-                post.get_absolute_url()
-            )
-            
-            # Создаем тему письма
-            subject = f"{cd['name']} ({cd['email']}) рекомендует Вам для ознакомления {post.title}"
-            
-            # Формируем тело письма
-            message = f"Ознакомьтесь {post.title} at {post_url}\n\n{cd['comments']}"
-            
-            # Отправляем email (реальная отправка требует настроек SMTP)
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=None,  # Используется DEFAULT_FROM_EMAIL из settings
-                recipient_list=[cd['to']]
-            )
+            # Ставим email в очередь - отправит воркер send_queued_mail,
+            # поэтому запрос не ждёт SMTP-сервер
+            enqueue_mail(**share_mail(request, post, form.cleaned_data))
             
             # Устанавливаем флаг успешной отправки
             sent = True
@@ -166,19 +185,46 @@ def post_share(request, post_id):
         }
     )
 
+def share_mail(request, post, cd):
+    """Аргументы enqueue_mail для письма "поделиться постом" из очищенных данных формы"""
+    # Формируем абсолютный URL поста
+    post_url = request.build_absolute_uri(
+        post.get_absolute_url()
+    )
+    return {
+        # Тема письма
+        'subject': f"{cd['name']} ({cd['email']}) рекомендует Вам для ознакомления {post.title}",
+        # Тело письма
+        'message': f"Ознакомьтесь {post.title} at {post_url}\n\n{cd['comments']}",
+        'from_email': None,  # Используется DEFAULT_FROM_EMAIL из settings
+        'recipient_list': [cd['to']],
+    }
+
 @require_POST
 def post_comment(request, post_id):
     """Обработчик отправки комментария к посту"""
     # Получаем пост по ID
     post = get_object_or_404(
-        Post, # Проверяем что пост существует
+        Post.published.only('id', 'publish', 'slug'), # Проверяем что пост существует
         id=post_id, # ID поста из URL
-        status=Post.Status.PUBLISHED #
     )
     # Инициализируем форму с данными из POST-запроса
     form = CommentForm(request.POST)
     # Проверяем валидность формы
     if form.is_valid():
+        # Автор комментария какое-то время читает с основной БД и сразу видит свой комментарий
+        pin_to_primary(request)
+        # В режиме buffered комментарий попадает в буфер и записывается воркером flush_comments
+        if buffering_enabled() and buffer_comment(post, form.cleaned_data):
+            return render(
+                request,
+                'blog/post/comment.html',
+                {'post': post,
+                 'form': form,
+                 'comment': form.instance,
+                 'pending': True
+                }
+            )
         # Если форма валидна - создаем новый комментарий
         comment = form.save(commit=False)
         comment.post = post  # Привязываем комментарий к посту
@@ -199,27 +245,24 @@ def post_search(request):
     form = SearchForm()  # Инициализируем форму поиска
     query = None  # Инициализируем переменную для запроса
     results = []  # Инициализируем список результатов
+    page = None  # Текущая страница результатов
+    timed_out = False  # Поиск прерван по таймауту БД
+    capped = False  # Результатов не меньше BLOG_SEARCH_MAX_RESULTS
 
     if 'query' in request.GET:  # Проверяем наличие параметра 'query' в GET-запросе
         form = SearchForm(request.GET)
         if form.is_valid():
             query = form.cleaned_data['query']
-            search_vector = SearchVector(
-                'title', weight='A'
-            ) + SearchVector('body', weight='B', config='russian')  # Создаем вектор поиска по заголовку и содержимому
-            # Создаем запрос поиска
-            # Используем SearchQuery для создания запроса
-            search_query = SearchQuery(query, config='russian')
-            
-            # Выполняем поиск по заголовкам и содержимому постов
-            results = (
-                Post.published.annotate(
-                    similarity=TrigramSimilarity('title', query),
+            # Ранжированный список id (не более BLOG_SEARCH_MAX_RESULTS), кешируется по запросу
+            ids, timed_out = search_post_ids(query)
+            # Выборка обрезана лимитом: настоящее число совпадений может быть больше
+            capped = len(ids) >= settings.BLOG_SEARCH_MAX_RESULTS
 
-                )    
-                .filter(similarity__gt=0.1)  # Фильтруем результаты по подобности
-                .order_by('-similarity')
-                ) # Сортируем по убыванию ранга
+            # Пагинация по списку id - из БД загружаются только посты текущей страницы
+            paginator = Paginator(ids, settings.BLOG_SEARCH_PER_PAGE)
+            page = paginator.get_page(request.GET.get('page'))
+            posts = Post.published.in_bulk(page.object_list)
+            results = [posts[pk] for pk in page.object_list if pk in posts]
 
     return render(
         request,
@@ -227,7 +270,10 @@ def post_search(request):
         {
             'form': form,  # Передаем форму поиска
             'query': query,  # Передаем запрос
-            'results': results  # Передаем результаты поиска}
+            'results': results,  # Передаем результаты поиска
+            'page': page,  # Страница результатов
+            'timed_out': timed_out,  # Поиск прерван по таймауту
+            'capped': capped  # Показано не всё найденное
         }
     )
 
@@ -0,0 +1,81 @@
+# Прогрев процесса при старте: первый запрос не платит за ленивую инициализацию
+import logging
+import os
+import time
+
+from django.core.signals import request_finished, request_started
+from django.template.loader import get_template
+from django.urls import get_resolver, reverse
+
+from .rendering import render_markdown
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), 'templates')
+
+# Маршруты без аргументов: reverse() строит словари резолвера для пространства имён blog
+WARMUP_URLS = ('blog:post_list', 'blog:post_search', 'blog:post_feed', 'blog_sitemap_index')
+
+# Момент начала прогрева (BlogConfig.ready) и начала первого запроса процесса
+_started = None
+_first_request = None
+
+
+def template_names():
+    """Имена всех шаблонов из blog/templates (как их передают в render)"""
+    for directory, _, filenames in os.walk(TEMPLATES_DIR):
+        for filename in sorted(filenames):
+            path = os.path.join(directory, filename)
+            yield os.path.relpath(path, TEMPLATES_DIR).replace(os.sep, '/')
+
+
+def compile_templates():
+    """Компилирует шаблоны в кеширующий загрузчик; возвращает их число"""
+    count = 0
+    for name in template_names():
+        get_template(name)
+        count += 1
+    return count
+
+
+def prime_urls():
+    """Импортирует URLconf и заполняет словари reverse()/resolve()"""
+    resolver = get_resolver()
+    resolver.reverse_dict  # noqa: B018 - заполняет корневой резолвер
+    for name in WARMUP_URLS:
+        reverse(name)
+
+
+def prime_markdown():
+    """Загружает модули и расширения Markdown (рендерер потока создаётся заново в каждом потоке)"""
+    render_markdown('*Прогрев* [Markdown](/) `рендерера`\n\n- список\n\n> цитата')
+
+
+def start_first_request(sender, **kwargs):
+    global _first_request
+    request_started.disconnect(dispatch_uid='blog.warmup.first_request')
+    _first_request = time.perf_counter()
+
+
+def report_first_request(sender, **kwargs):
+    request_finished.disconnect(dispatch_uid='blog.warmup.first_request')
+    now = time.perf_counter()
+    logger.info(
+        'blog: first request took %.0f ms, finished %.0f ms after startup (pid %s)',
+        (now - (_first_request or now)) * 1000, (now - _started) * 1000, os.getpid(),
+    )
+
+
+def warm_up():
+    """Прогревает процесс и логирует, сколько это заняло"""
+    global _started
+    _started = time.perf_counter()
+    templates = compile_templates()
+    prime_urls()
+    prime_markdown()
+    logger.info(
+        'blog: warm-up done in %.0f ms (%d templates, pid %s)',
+        (time.perf_counter() - _started) * 1000, templates, os.getpid(),
+    )
+    request_started.connect(start_first_request, dispatch_uid='blog.warmup.first_request')
+    request_finished.connect(report_first_request, dispatch_uid='blog.warmup.first_request')
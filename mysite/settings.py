@@ -11,7 +11,8 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import Choices, Csv, config
+from django.core.exceptions import ImproperlyConfigured
 # Email server configuration
 # Example of sending email with Django:
 # from django.core.mail import send_mail
@@ -30,21 +31,42 @@ EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD')
 EMAIL_PORT = 587
 EMAIL_USE_TLS = True
 DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL')
+# Письма из post_share складываются в очередь blog.OutgoingEmail и отправляются
+# воркером: python manage.py send_queued_mail --loop
+BLOG_OUTBOX_BATCH_SIZE = config('BLOG_OUTBOX_BATCH_SIZE', default=50, cast=int)  # Писем на одно SMTP-соединение
+BLOG_OUTBOX_MAX_ATTEMPTS = config('BLOG_OUTBOX_MAX_ATTEMPTS', default=5, cast=int)  # Попыток до FAILED
+BLOG_OUTBOX_RETRY_DELAY = config('BLOG_OUTBOX_RETRY_DELAY', default=60, cast=int)  # Базовая задержка повтора (с)
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
 
-# Quick-start development settings - unsuitable for production
+# Профиль настроек: development (по умолчанию) или production.
+# production выключает DEBUG (нет журнала SQL в памяти, статика с хешем в имени),
+# требует SECRET_KEY и ALLOWED_HOSTS и прогревает процесс при старте (BLOG_WARMUP)
 # See https://docs.djangoproject.com/en/5.0/howto/deployment/checklist/
+DJANGO_PROFILE = config(
+    'DJANGO_PROFILE', default='development', cast=Choices(['development', 'production'])
+)
+PRODUCTION = DJANGO_PROFILE == 'production'
 
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-w+$@3v*a=ytk-jg-6$lxjnva8q+@$v05_)go)_-#b2ybokilzq'
+if PRODUCTION:
+    SECRET_KEY = config('SECRET_KEY')
+else:
+    SECRET_KEY = config(
+        'SECRET_KEY',
+        default='django-insecure-w+$@3v*a=ytk-jg-6$lxjnva8q+@$v05_)go)_-#b2ybokilzq'
+    )
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = config('DEBUG', default=not PRODUCTION, cast=bool)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='', cast=Csv())
+
+# Прогрев при старте процесса (blog.warmup): компиляция шаблонов blog/templates,
+# построение URL-резолвера и загрузка Markdown до первого запроса
+BLOG_WARMUP = config('BLOG_WARMUP', default=PRODUCTION, cast=bool)
 
 SITE_ID = 1
 
@@ -66,19 +88,45 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    # Статика из STATIC_ROOT (сжатые варианты, immutable) - до сессий и представлений
+    'blog.staticfiles.StaticFilesMiddleware',
+    # Анонимные GET публичных страниц без cookie сессии пропускают сессии, auth и
+    # сообщения (см. blog.fastpath); sessions/auth/messages ниже - их подклассы
+    'blog.fastpath.FastPathMiddleware',
+    'blog.fastpath.SessionMiddleware',
+    # Выбор реплики для чтения Post.published (после сессий: закреплённые сессии читают с основной БД)
+    'blog.routers.ReadReplicaMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'blog.fastpath.AuthenticationMiddleware',
+    'blog.fastpath.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Замеры SQL/шаблонов/markdown, Server-Timing и журнал запросов (см. blog.instrumentation)
+    'blog.instrumentation.InstrumentationMiddleware',
 ]
 
+# Короткий путь через MIDDLEWARE (blog.fastpath) и маршруты, для которых он действует.
+# post_share, post_comment и админка всегда проходят полный набор middleware
+BLOG_FAST_PATH = config('BLOG_FAST_PATH', default=True, cast=bool)
+BLOG_FAST_PATH_ROUTES = {
+    'post_list',
+    'blog:post_list',
+    'blog:post_list_by_tag',
+    'blog:post_detail',
+    'blog:post_comments',
+    'blog:post_feed',
+    'blog:post_feed_by_tag',
+    'blog:post_search',
+    'blog_sitemap_index',
+    'blog_sitemap_section',
+}
+
 ROOT_URLCONF = 'mysite.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для Server-Timing
+        'BACKEND': 'blog.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -98,6 +146,13 @@ WSGI_APPLICATION = 'mysite.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# Повторное использование соединений с PostgreSQL (замеры - в docs/database-connections.md):
+#   по умолчанию - постоянные соединения: одно на поток, живёт DB_CONN_MAX_AGE секунд,
+#   перед использованием в новом запросе проверяется (DB_CONN_HEALTH_CHECKS);
+#   DB_POOL=True - пул psycopg (нужен пакет psycopg[pool]) размером
+#   DB_POOL_MIN_SIZE..DB_POOL_MAX_SIZE; с пулом CONN_MAX_AGE должен быть 0.
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -105,9 +160,158 @@ DATABASES = {
         'USER': config('DB_USER'),
         'PASSWORD': config('DB_PASSWORD'),
         'HOST': config('DB_HOST'),
+        'PORT': config('DB_PORT', default=''),
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+        'OPTIONS': {},
     }
 }
 
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        # Сколько секунд запрос ждёт свободное соединение, прежде чем получить ошибку
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+    }
+
+# Реплики для чтения опубликованного контента (blog.routers): DB_REPLICA_HOSTS=host1,host2
+# создаёт алиасы replica1, replica2 с теми же учётными данными, что и основная БД.
+# Две локальные БД для проверки: DB_REPLICA_HOSTS=localhost DB_REPLICA_NAME=<копия БД>.
+# В тестах реплики зеркалируют основную БД (TEST MIRROR).
+for number, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), 1):
+    DATABASES[f'replica{number}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'NAME': config('DB_REPLICA_NAME', default=DATABASES['default']['NAME']),
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+BLOG_READ_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+# Сколько секунд сессия после записи (комментария) читает с основной БД - с запасом на отставание реплик
+BLOG_REPLICA_PIN_SECONDS = config('BLOG_REPLICA_PIN_SECONDS', default=10, cast=int)
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Backend задаётся через окружение, например:
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache CACHE_LOCATION=redis://127.0.0.1:6379
+#   CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache CACHE_LOCATION=/var/tmp/mysite_cache
+#   CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache CACHE_LOCATION=mysite_cache
+#   (для DatabaseCache нужно выполнить python manage.py createcachetable)
+
+CACHES = {
+    'default': {
+        'BACKEND': config(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': config('CACHE_LOCATION', default='mysite'),
+    }
+}
+
+# Страницы, боковая панель и id постов сбрасываются удалением ключей из кеша.
+# LocMemCache у каждого процесса свой: правка в одном воркере или в команде
+# (publish_scheduled, flush_comments, import_blog) не доходит до остальных,
+# поэтому в production нужен общий backend (Redis, Memcached, DatabaseCache)
+if PRODUCTION and CACHES['default']['BACKEND'] == 'django.core.cache.backends.locmem.LocMemCache':
+    raise ImproperlyConfigured(
+        'DJANGO_PROFILE=production requires a shared CACHE_BACKEND '
+        '(Redis, Memcached or DatabaseCache), not LocMemCache'
+    )
+
+# Время жизни кеша боковой панели (секунды); основная инвалидация - через сигналы
+BLOG_SIDEBAR_CACHE_TIMEOUT = config('BLOG_SIDEBAR_CACHE_TIMEOUT', default=600, cast=int)
+
+
+# Приём комментариев:
+#   'direct'   - комментарий сразу записывается в blog_comment
+#   'buffered' - комментарий попадает в буфер PendingComment и переносится
+#                воркером: python manage.py flush_comments --loop
+BLOG_COMMENT_INGESTION = config('BLOG_COMMENT_INGESTION', default='direct')
+BLOG_COMMENT_BUFFER_LIMIT = config('BLOG_COMMENT_BUFFER_LIMIT', default=10000, cast=int)  # При переполнении - прямая запись
+BLOG_COMMENT_FLUSH_BATCH_SIZE = config('BLOG_COMMENT_FLUSH_BATCH_SIZE', default=500, cast=int)
+
+# Комментариев на одной странице поста (следующие подгружаются по требованию)
+BLOG_COMMENTS_PER_PAGE = config('BLOG_COMMENTS_PER_PAGE', default=20, cast=int)
+
+# RSS-ленты: количество записей и время жизни закешированного XML (секунды).
+# Ключ кеша содержит версию контента, поэтому правка поста сразу даёт новую ленту
+BLOG_FEED_LENGTH = config('BLOG_FEED_LENGTH', default=5, cast=int)
+BLOG_FEED_CACHE_TIMEOUT = config('BLOG_FEED_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+
+# Время жизни закешированных страниц для анонимных читателей (секунды).
+# Пост и списки сбрасываются сигналами адресно; TTL ограничивает устаревание
+# общей боковой панели, которая есть на каждой странице
+BLOG_PAGE_CACHE_TIMEOUT = config('BLOG_PAGE_CACHE_TIMEOUT', default=300, cast=int)
+# Время жизни кеша (год, месяц, день, slug) -> id поста; при правке поста ключ удаляется сигналом
+BLOG_POST_ID_CACHE_TIMEOUT = config('BLOG_POST_ID_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# Режим пагинации списка постов:
+#   'cursor' - keyset-пагинация по (publish, id), не замедляется на глубоких страницах
+#   'page'   - классическая постраничная навигация (COUNT + OFFSET)
+BLOG_PAGINATION_MODE = config('BLOG_PAGINATION_MODE', default='cursor')
+
+# Async-версии публичных представлений (blog.async_views) - для запуска под ASGI
+# (mysite.asgi). Под WSGI каждое async-представление выполнялось бы через async_to_sync.
+BLOG_ASYNC_VIEWS = config('BLOG_ASYNC_VIEWS', default=False, cast=bool)
+
+
+# Поиск: результатов на странице, верхняя граница выборки,
+# время жизни кеша ранжированных id (секунды) и statement_timeout запроса (мс)
+BLOG_SEARCH_PER_PAGE = config('BLOG_SEARCH_PER_PAGE', default=10, cast=int)
+BLOG_SEARCH_MAX_RESULTS = config('BLOG_SEARCH_MAX_RESULTS', default=200, cast=int)
+BLOG_SEARCH_CACHE_TIMEOUT = config('BLOG_SEARCH_CACHE_TIMEOUT', default=60, cast=int)
+BLOG_SEARCH_STATEMENT_TIMEOUT = config('BLOG_SEARCH_STATEMENT_TIMEOUT', default=2000, cast=int)
+# Минимальное сходство заголовка с запросом в поиске по триграммам (запасной вариант для опечаток)
+BLOG_SEARCH_TRIGRAM_THRESHOLD = config('BLOG_SEARCH_TRIGRAM_THRESHOLD', default=0.1, cast=float)
+
+
+# Инструментирование запросов (blog.instrumentation.InstrumentationMiddleware):
+# число SQL-запросов, время БД, шаблонов и фильтра markdown для каждого запроса
+BLOG_INSTRUMENTATION = config('BLOG_INSTRUMENTATION', default=True, cast=bool)
+# Заголовок Server-Timing раскрывает время БД любому клиенту - в production выключен
+BLOG_SERVER_TIMING = config('BLOG_SERVER_TIMING', default=not PRODUCTION, cast=bool)
+# Доля запросов, попадающих в журнал (запросы с подозрением на N+1 пишутся всегда)
+BLOG_INSTRUMENTATION_SAMPLE_RATE = config('BLOG_INSTRUMENTATION_SAMPLE_RATE', default=0.01, cast=float)
+# Сколько раз один и тот же SQL должен выполниться за запрос, чтобы считаться N+1
+BLOG_INSTRUMENTATION_N_PLUS_ONE = config('BLOG_INSTRUMENTATION_N_PLUS_ONE', default=5, cast=int)
+# Журнал в формате JSON Lines - по объекту на строку
+BLOG_INSTRUMENTATION_LOG = config('BLOG_INSTRUMENTATION_LOG', default=str(BASE_DIR / 'instrumentation.jsonl'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'jsonl': {'format': '%(message)s'},  # Строка уже сериализована в JSON
+    },
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+        'instrumentation': {
+            'class': 'logging.FileHandler',
+            'filename': BLOG_INSTRUMENTATION_LOG,
+            'formatter': 'jsonl',
+            'delay': True,  # Файл создаётся при первой записи
+        },
+    },
+    'loggers': {
+        # Время прогрева и первого запроса после старта процесса
+        'blog.warmup': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+        'blog.instrumentation': {
+            'handlers': ['instrumentation'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -145,6 +349,31 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Сюда collectstatic складывает файлы с хешем в имени и их .gz/.br варианты
+STATIC_ROOT = config('STATIC_ROOT', default=str(BASE_DIR / 'staticfiles'))
+
+# Хеш содержимого в именах файлов ({% static %} берёт имена из манифеста).
+# Требует collectstatic, поэтому по умолчанию включено только без DEBUG
+BLOG_STATIC_MANIFEST = config('BLOG_STATIC_MANIFEST', default=not DEBUG, cast=bool)
+
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': (
+            'blog.staticfiles.CompressedManifestStaticFilesStorage'
+            if BLOG_STATIC_MANIFEST
+            else 'django.contrib.staticfiles.storage.StaticFilesStorage'
+        ),
+    },
+}
+
+# Раздача STATIC_ROOT самим приложением (StaticFilesMiddleware): файлы с хешем
+# отдаются с Cache-Control immutable, остальные - с max-age BLOG_STATIC_MAX_AGE
+BLOG_SERVE_STATIC = config('BLOG_SERVE_STATIC', default=not DEBUG, cast=bool)
+BLOG_STATIC_MAX_AGE = config('BLOG_STATIC_MAX_AGE', default=60, cast=int)
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -1,23 +1,22 @@
 # Импорт необходимых модулей Django
 from django.contrib import admin  # Модуль административной панели
-from django.contrib.sitemaps.views import sitemap  # Модуль для работы с картами сайта
 from django.urls import include, path  # Функции для работы с URL-маршрутами
-from blog.sitemaps import PostSitemap  # Импорт класса карты сайта для постов
-from blog import views  # Импорт views из приложения blog
+from blog.sitemaps import sitemap_index, sitemap_section  # Карта сайта по месяцам
+from blog.urls import public_views  # views или async_views (BLOG_ASYNC_VIEWS)
 
-sitemaps = {
-    'posts': PostSitemap,  # Определение карты сайта для постов
-}
 # Основной список URL-маршрутов проекта
 urlpatterns = [
     # Маршрут к административной панели Django
     # Доступен по URL: /admin/
     path('admin/', admin.site.urls),
-    path('', views.post_list, name='post_list'),  # Главная страница сайта
-    path('sitemap.xml',  # URL для карты сайта
-        sitemap,  # Функция для генерации карты сайта
-        {'sitemaps': sitemaps},  # Передача параметров в функцию
-        name='django.contrib.sitemaps.views.sitemap'  # Имя маршрута
+    path('', public_views.post_list, name='post_list'),  # Главная страница сайта
+    path('sitemap.xml',  # URL для индекса карты сайта
+        sitemap_index,  # Индекс со ссылками на секции по месяцам
+        name='blog_sitemap_index'  # Имя маршрута
+    ),
+    path('sitemap-<int:year>-<int:month>.xml',  # Секция карты сайта за месяц
+        sitemap_section,  # Потоковая генерация XML секции
+        name='blog_sitemap_section'  # Имя маршрута
     ),
 
     # Подключение URL-маршрутов из приложения blog